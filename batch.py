@@ -0,0 +1,163 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Batch file responsible for solving many CNF files
+# in a pool of processes, reused across files
+#
+
+import sys
+import os
+import time
+import json
+import getopt
+import multiprocessing
+import convert
+import parallel
+import solver
+
+
+# Solves a single CNF file
+# Runs in a worker process of the batch
+#
+# @param task : the path of the file, the configuration, k for momsf
+#               and the budget of every file (or None)
+#
+# @return a dictionary with the results
+#
+def solveFile(task):
+
+	path, configuration, k, budget = task
+	start = time.time()
+
+	try:
+		with convert.openFile(path) as f:
+			packed = convert.load(f, "", False, False, True)
+
+		if packed.emptyClause():
+			return { "file" : path, "status" : "UNSAT", "time" : round(time.time() - start, 4),
+				"splits" : 0, "failed" : 0, "units" : 0, "pures" : 0 }
+
+		configuration, result, splits, elapsed = parallel.run((packed, configuration, k, budget))
+
+	except Exception as err:
+		return { "file" : path, "status" : "ERROR", "error" : str(err) }
+
+	# The statistics of the search so far
+	if isinstance(result, solver.Unknown):
+		return { "file" : path, "status" : "UNKNOWN", "reason" : str(result),
+			"time" : round(time.time() - start, 4), "splits" : splits[0], "failed" : splits[1] }
+
+	return { "file" : path,
+			 "status" : "SAT" if result else "UNSAT",
+			 "time" : round(time.time() - start, 4),
+			 "splits" : splits[0],
+			 "failed" : splits[1],
+			 "units" : len(result[1]) if result else 0,
+			 "pures" : len(result[2]) if result else 0 }
+
+
+# Returns the CNF files given as arguments :
+# files are kept, directories are replaced by their files
+def files(arguments):
+
+	found = []
+
+	for argument in arguments:
+		if os.path.isdir(argument):
+			found.extend(sorted( os.path.join(argument, name) for name in os.listdir(argument)
+				if os.path.isfile(os.path.join(argument, name)) ))
+		else:
+			found.append(argument)
+
+	return found
+
+
+# STEP 1 :
+# -----
+# Retrieve all arguments
+if __name__ == "__main__":
+
+	try:
+		optlist, args = getopt.gnu_getopt(sys.argv[1:], '', ['heuristic=', 'pure', 'unit', 'trail',
+			'iterative', 'cdcl', 'index', 'numpy', 'k=', 'processes=', 'output=',
+			'timeout=', 'maxsplits=', 'maxconflicts=', 'maxmemory=', 'help'])
+
+	except getopt.GetoptError as err:
+		print str(err)
+		exit(0)
+
+	# STEP 2 :
+	# -----
+	# Handle the optional arguments
+	heuristic, options, k, processes, output = "firstLiteral", [], 0, multiprocessing.cpu_count(), sys.stdout
+	budget = None
+
+	for option, value in optlist:
+		if option == "--heuristic":
+			heuristic = value
+		elif option in ["--pure", "--unit", "--trail", "--iterative", "--cdcl", "--index", "--numpy"]:
+			options.append(option[2:])
+		elif option == "--k":
+			k = int(value)
+		elif option == "--processes":
+			processes = int(value)
+		elif option == "--output":
+			output = open(value, "w")
+		elif option in ["--timeout", "--maxsplits", "--maxconflicts", "--maxmemory"]:
+			budget = budget or solver.Budget()
+			if option == "--timeout":
+				budget.seconds = float(value)
+			elif option == "--maxsplits":
+				budget.splits = int(value)
+			elif option == "--maxconflicts":
+				budget.conflicts = int(value)
+			else:
+				budget.memory = int(float(value) * 1024 * 1024)
+		elif option == "--help":
+			args = []
+
+	if not args:
+		print "Usage : batch.py CNF|DIRECTORY ... [--heuristic=...] [--pure] [--unit] [--trail] [--iterative] [--cdcl] [--index] [--numpy] [--k=...] [--processes=...] [--output=...] [--timeout=...] [--maxsplits=...] [--maxconflicts=...] [--maxmemory=...]"
+		exit(0)
+
+	# Same configuration as in portfolio mode
+	configuration = '+'.join([heuristic] + options)
+
+	try:
+		parallel.parse(configuration)
+	except ValueError as err:
+		print "ERROR : %s" % err
+		exit(0)
+
+
+	# STEP 3 :
+	# -----
+	# Solve every file and write one JSON line per file
+	# in the order in which they are solved
+	paths = files(args)
+	pool = multiprocessing.Pool(processes)
+	start = time.time()
+
+	try:
+		for result in pool.imap_unordered(solveFile, [ (path, configuration, k, budget) for path in paths ]):
+			output.write(json.dumps(result, sort_keys=True) + "\n")
+			output.flush()
+	finally:
+		pool.terminate()
+		pool.join()
+
+	end = time.time()
+
+
+	# STEP 4 :
+	# -----
+	# Display the throughput
+	elapsed = max(end - start, 1e-6)
+	sys.stderr.write(" Solved %d instances in %r seconds (%r instances per minute) \n" % (
+		len(paths), round(elapsed, 4), round(len(paths) * 60 / elapsed, 2)))
@@ -0,0 +1,299 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Benchmark file responsible for timing every heuristic
+# with and without Unit Propagation and Pure Elimination
+# and for comparing two benchmarks
+#
+
+import sys
+import os
+import math
+import json
+import random
+import getopt
+import multiprocessing
+import convert
+import branching
+import parallel
+
+try:
+	import resource
+except ImportError:
+	# Peak memory is only measured on Unix
+	resource = None
+
+
+# Settings of Unit Propagation and Pure Elimination
+# benchmarked for every heuristic
+settings = [ "", "+unit", "+pure", "+unit+pure" ]
+
+# Clause/variable ratios of the random 3-SAT instances
+# (4.26 is the hardest ratio)
+ratios = [ 3.0, 4.26, 5.0 ]
+
+
+# Generates a random 3-SAT instance in DIMACS format
+#
+# @param n : number of variables
+# @param ratio : number of clauses per variable
+# @param seed : seed of the generator
+#
+# @return the instance as a string
+#
+def random3SAT(n, ratio, seed):
+
+	generator = random.Random(seed)
+	m = int(round(n * ratio))
+	lines = [ "p cnf %d %d" % (n, m) ]
+
+	for i in xrange(m):
+		variables = generator.sample(xrange(1, n + 1), 3)
+		lines.append(' '.join( str(v if generator.random() < 0.5 else -v) for v in variables ) + " 0")
+
+	return '\n'.join(lines)
+
+
+# Returns the peak resident memory of the process in KB
+def peak():
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+
+
+# Solves a Packed CNF once and sends the result through a pipe
+# Runs in its own process so that it can be stopped
+#
+# The forked process starts with the pages of the benchmark
+# (every parsed instance), so the memory of the run is its
+# peak above the peak at its start
+def measure(connection, packed, configuration, k):
+
+	baseline = peak()
+	configuration, result, splits, elapsed = parallel.run((packed, configuration, k, None))
+	memory = peak() - baseline if resource else None
+
+	connection.send(("SAT" if result else "UNSAT", elapsed, splits, memory))
+	connection.close()
+
+
+# Runs a configuration on a Packed CNF several times
+#
+# @param packed : the Packed CNF
+# @param configuration : the configuration (see parallel.py)
+# @param repeat : number of runs
+# @param timeout : seconds after which a run is stopped
+# @param k : constant of the momsf heuristic
+#
+# @return a dictionary with the status, the statistics
+#         of the times, the splits and the peak memory
+#         (and the exit code of a run which crashed)
+#
+def benchmark(packed, configuration, repeat, timeout, k):
+
+	times, splits, memory, status = [], [0, 0], None, None
+	exitcode = None
+
+	for i in xrange(repeat):
+
+		receiver, sender = multiprocessing.Pipe(False)
+		process = multiprocessing.Process(target=measure, args=(sender, packed, configuration, k))
+		process.start()
+
+		# Only the run keeps the pipe open, so a crash
+		# ends the poll at once
+		sender.close()
+
+		# Stop the run after the timeout
+		if not receiver.poll(timeout):
+			process.terminate()
+			process.join()
+			status = "TIMEOUT"
+			break
+
+		try:
+			status, elapsed, splits, memory = receiver.recv()
+		except EOFError:
+			process.join()
+			status, exitcode = "ERROR", process.exitcode
+			break
+
+		process.join()
+		times.append(elapsed)
+
+	record = { "configuration" : configuration, "status" : status, "times" : times,
+			   "splits" : splits[0], "failed" : splits[1], "memory" : memory }
+
+	if exitcode != None:
+		record["exitcode"] = exitcode
+
+	if times:
+		mean = sum(times) / len(times)
+		record["mean"] = mean
+		record["min"] = min(times)
+		record["stdev"] = math.sqrt(sum( (t - mean) ** 2 for t in times ) / len(times))
+
+	return record
+
+
+# Returns the instances of the benchmark as (name, Packed CNF)
+#
+# @param directory : folder with the DIMACS files
+# @param n : number of variables of the random instances
+#            (0 for no random instances)
+#
+def instances(directory, n):
+
+	found = []
+
+	for name in sorted(os.listdir(directory)):
+		with convert.openFile(os.path.join(directory, name)) as f:
+			found.append((name, convert.load(f, "", False, False, True)))
+
+	if n:
+		for ratio in ratios:
+			name = "random-3sat-%d-%r" % (n, ratio)
+			found.append((name, convert.generate(random3SAT(n, ratio, n), "", False, False, True)))
+
+	return found
+
+
+# Compares the records of two benchmarks and displays
+# the runs whose status or splits changed or which
+# became slower than threshold times the old mean
+#
+# @return the number of regressions
+#
+def compare(old, new, threshold):
+
+	before = dict( ((r["instance"], r["configuration"]), r) for r in old )
+	regressions = 0
+
+	for record in new:
+
+		key = (record["instance"], record["configuration"])
+		if key not in before:
+			continue
+
+		previous = before[key]
+		messages = []
+
+		if record["status"] != previous["status"]:
+			messages.append("status %s -> %s" % (previous["status"], record["status"]))
+
+		elif record["splits"] != previous["splits"]:
+			messages.append("splits %r -> %r" % (previous["splits"], record["splits"]))
+
+		if "mean" in record and "mean" in previous and record["mean"] > threshold * max(previous["mean"], 1e-3):
+			messages.append("time %.4f -> %.4f (x%.2f)" % (previous["mean"], record["mean"],
+				record["mean"] / max(previous["mean"], 1e-6)))
+
+		if messages:
+			regressions += 1
+			print " %s %s : %s " % (key[0], key[1], ', '.join(messages))
+
+	print " %d regressions over %d runs " % (regressions, len(new))
+	return regressions
+
+
+# STEP 1 :
+# -----
+# Retrieve all arguments
+if __name__ == "__main__":
+
+	try:
+		optlist, args = getopt.gnu_getopt(sys.argv[1:], '', ['heuristics=', 'options=', 'directory=',
+			'random=', 'repeat=', 'timeout=', 'k=', 'json=', 'csv=', 'compare', 'threshold=', 'help'])
+
+	except getopt.GetoptError as err:
+		print str(err)
+		exit(0)
+
+	# STEP 2 :
+	# -----
+	# Handle the optional arguments
+	heuristics = sorted(branching.heuristics)
+	options, directory, n, repeat, timeout, k = "", "cnf", 50, 3, 60.0, 2
+	output, table, threshold, _compare = None, None, 1.2, False
+
+	for option, value in optlist:
+		if option == "--heuristics":
+			heuristics = value.split(',')
+		elif option == "--options":
+			options = ''.join( "+" + o for o in value.split(',') )
+		elif option == "--directory":
+			directory = value
+		elif option == "--random":
+			n = int(value)
+		elif option == "--repeat":
+			repeat = int(value)
+		elif option == "--timeout":
+			timeout = float(value)
+		elif option == "--k":
+			k = int(value)
+		elif option == "--json":
+			output = value
+		elif option == "--csv":
+			table = value
+		elif option == "--compare":
+			_compare = True
+		elif option == "--threshold":
+			threshold = float(value)
+		elif option == "--help":
+			print "Usage : benchmark.py [--heuristics=...] [--options=...] [--directory=...] [--random=...] [--repeat=...] [--timeout=...] [--k=...] [--json=...] [--csv=...]"
+			print "        benchmark.py --compare OLD.json NEW.json [--threshold=...]"
+			exit(0)
+
+
+	# STEP 3 :
+	# -----
+	# Compare two benchmarks
+	if _compare:
+
+		if len(args) != 2:
+			print "ERROR : Please provide two JSON benchmarks"
+			exit(0)
+
+		with open(args[0]) as old, open(args[1]) as new:
+			regressions = compare(json.load(old), json.load(new), threshold)
+
+		exit(1 if regressions else 0)
+
+
+	# STEP 4 :
+	# -----
+	# Run every configuration on every instance
+	records = []
+
+	for name, packed in instances(directory, n):
+		for heuristic in heuristics:
+			for setting in settings:
+
+				configuration = heuristic + setting + options
+				record = benchmark(packed, configuration, repeat, timeout, k)
+				record["instance"] = name
+				records.append(record)
+
+				print " %-28s %-32s %-7s %10s s %8r splits %8r failed %10s KB " % (name, configuration,
+					record["status"], "%.4f" % record["mean"] if "mean" in record else "-",
+					record["splits"], record["failed"], record["memory"] or "-")
+				sys.stdout.flush()
+
+
+	# STEP 5 :
+	# -----
+	# Write the matrix
+	if output:
+		with open(output, "w") as f:
+			json.dump(records, f, indent=1, sort_keys=True)
+
+	if table:
+		with open(table, "w") as f:
+			f.write("instance,configuration,status,mean,min,stdev,splits,failed,memory\n")
+			for r in records:
+				f.write(','.join( "" if r.get(key) == None else str(r[key]) for key in ["instance", "configuration", "status",
+					"mean", "min", "stdev", "splits", "failed", "memory"] ) + "\n")
@@ -22,8 +22,41 @@ def setK(v):
 	global k
 	k = v
 
+# Number of variables examined by the lookahead heuristic
+lookaheads = 10
+
+# Whether the lookahead heuristic propagates the units of the
+# CNF, set by the solvers which only do with Unit Propagation
+unit = False
+
+def setUnit(v):
+	global unit
+	unit = v
+
 # ======== Helpers =========== #
 
+# Returns the Index of the occurrences kept by
+# a trail Formula or None for a simple CNF
+def getIndex(cnf):
+	return getattr(cnf, "index", None)
+
+
+# Returns the NumPy Scores of a trail Formula
+# or None (the Index is used first)
+def getScores(cnf):
+	if getIndex(cnf) != None:
+		return None
+	return getattr(cnf, "scores", None)
+
+
+# Returns the clauses with minimum size of a CNF
+# from the buckets of its Index if it has one
+def minCNFClauses(cnf):
+	if getIndex(cnf) != None:
+		return getIndex(cnf).minClauses()
+	return minClauses(cnf.clauses)
+
+
 # Returns the clauses with minimum size
 def minClauses(clauses):
 	minClauses = [];
@@ -140,6 +173,287 @@ def variableCountHelper(clauses, id):
 
 
 
+# Returns the n variables with the highest two sided
+# Jeroslow-Wang score as one of their literals
+# (the cheap filter of the lookahead heuristic)
+# together with a function returning the number of
+# clauses containing a literal given as a string
+def candidates(cnf, n):
+
+	index = getIndex(cnf)
+
+	# The Index keeps the scores of the literals
+	if index != None:
+		m, weights, counts = index.variables, index.weights, index.counts
+		scores = [ (weights[m + v] + weights[m - v], v) for v in xrange(1, m + 1)
+			if cnf.values[v] == 0 and weights[m + v] + weights[m - v] > 0 ]
+		return [ cnf.literal(v) for score, v in sorted(scores, reverse=True)[:n] ], lambda x : counts[m + int(x)]
+
+	score = defaultdict(float)
+	occurrences = defaultdict(int)
+	reference = {}
+
+	for clause in cnf.clauses:
+		for literal in clause.literals:
+			score[literal.variable] += math.pow(2, -len(clause.literals))
+			occurrences[str(literal)] += 1
+			reference[literal.variable] = literal
+
+	return [ reference[v] for v in sorted(score, key=score.get, reverse=True)[:n] ], lambda x : occurrences[x]
+
+
+# Returns the negation of a literal
+def negation(cnf, literal):
+	if hasattr(cnf, "trail"):
+		return cnf.literal(-cnf.code(literal))
+	return literal.__class__(literal.variable, not literal.polarity)
+
+
+# Assigns a value to a literal and propagates the units
+# on a copy of a CNF, or on a new decision level of a
+# trail Formula which is undone afterwards
+#
+# @return whether an empty clause was found (for a Formula
+#         the clause learned from it, or None) and the
+#         literals assigned to True as strings
+def probe(cnf, literal, value):
+
+	if hasattr(cnf, "trail"):
+		level, size = cnf.level(), len(cnf.trail)
+
+		cnf.decide()
+		cnf.assign(literal, value)
+		cnf.unitPropagate()
+
+		assigned = [ str(x) for x in cnf.trail[size:] ]
+		failed = cnf.analyze(True, True)[0] if cnf.emptyClause() else None
+
+		# The probed values are not saved as phases
+		cnf.backtrack(level, False)
+		return failed, assigned
+
+	copy = cnf.copy()
+	copy.assign(literal, value)
+	copy.unitPropagate()
+	return copy.emptyClause(), [ str(literal if value else negation(cnf, literal)) ] + copy.units[len(cnf.units):]
+
+
+# Assigns the opposite value to a failed literal on the current
+# level and propagates the units with Unit Propagation
+#
+# A Formula learns the clause of the conflict found by the probe,
+# which asserts the opposite value : the literal then has a reason
+# for the conflict analysis and is implied again after a backjump
+def refute(cnf, literal, value, failed):
+
+	if hasattr(cnf, "trail"):
+		cnf.learn(failed, cnf.level() + 1, True)
+	else:
+		cnf.assign(literal, not value)
+
+	if unit:
+		cnf.unitPropagate()
+
+
+# Returns whether a literal of the CNF is still unassigned
+def unassigned(cnf, literal):
+	if hasattr(cnf, "trail"):
+		return cnf.value(cnf.code(literal)) == None
+	return any( l.variable == literal.variable for l in cnf.getLiterals() )
+
+
+
+# ======== Activity ========== #
+
+# Activity of the variables of a trail Formula
+# for the VSIDS heuristic
+#
+# Variables are bumped when they take part in a conflict
+# and all activities decay exponentially : instead of
+# multiplying every activity by the decay, the bump is
+# divided by it after every conflict (EVSIDS).
+#
+# The variables are kept in a binary max-heap of activities.
+# Assigned variables are only removed once they reach the top
+# and are inserted again when they are unassigned.
+#
+# @field formula : the Formula whose variables are scored
+# @field scores : activity of each variable
+# @field increment : current size of a bump
+# @field decay : factor by which the activities decay per conflict
+# @field heap : variables ordered by activity
+# @field positions : position of each variable in the heap or -1
+# @field phases : last value of each variable (phase saving)
+# @field inserts : number of insertions in the heap
+# @field removals : number of removals from the heap
+# @field updates : number of bumps of a variable in the heap
+#
+class Activity:
+
+	# ========= Fields =========== #
+
+	formula = None
+	scores = []
+	increment = 1.0
+	decay = 0.95
+	heap = []
+	positions = []
+	phases = bytearray()
+	inserts = 0
+	removals = 0
+	updates = 0
+
+	# ====== Constructors ======== #
+
+	# Activity Constructor
+	# Activities start with the number of occurrences of each
+	# variable and phases with its most frequent polarity
+	def __init__(self, formula, decay = 0.95):
+
+		n = len(formula.values) - 1
+		positive, negative = [0] * (n + 1), [0] * (n + 1)
+
+		for x in formula.literals:
+			if x > 0:
+				positive[x] += 1
+			else:
+				negative[-x] += 1
+
+		self.formula = formula
+		self.scores = [ float(positive[v] + negative[v]) for v in xrange(n + 1) ]
+		self.increment = 1.0
+		self.decay = decay
+		self.heap = []
+		self.positions = [-1] * (n + 1)
+		self.phases = bytearray([ 1 if positive[v] >= negative[v] else 2 for v in xrange(n + 1) ])
+		self.inserts, self.removals, self.updates = 0, 0, 0
+
+		for v in xrange(1, n + 1):
+			if formula.values[v] == 0:
+				self.insert(v)
+
+	# ======== Methods =========== #
+
+	# Moves the variable at position i up
+	# while its activity is higher than its parent's
+	def up(self, i):
+
+		heap, positions, scores = self.heap, self.positions, self.scores
+		v = heap[i]
+
+		while i > 0 and scores[heap[(i - 1) / 2]] < scores[v]:
+			heap[i] = heap[(i - 1) / 2]
+			positions[heap[i]] = i
+			i = (i - 1) / 2
+
+		heap[i] = v
+		positions[v] = i
+
+
+	# Moves the variable at position i down
+	# while one of its children has a higher activity
+	def down(self, i):
+
+		heap, positions, scores = self.heap, self.positions, self.scores
+		v = heap[i]
+
+		while 2 * i + 1 < len(heap):
+
+			child = 2 * i + 1
+			if child + 1 < len(heap) and scores[heap[child + 1]] > scores[heap[child]]:
+				child += 1
+
+			if scores[heap[child]] <= scores[v]:
+				break
+
+			heap[i] = heap[child]
+			positions[heap[i]] = i
+			i = child
+
+		heap[i] = v
+		positions[v] = i
+
+
+	# Inserts a variable which is not in the heap
+	def insert(self, v):
+
+		if self.positions[v] != -1:
+			return
+
+		self.inserts += 1
+		self.heap.append(v)
+		self.up(len(self.heap) - 1)
+
+
+	# Removes the variable with the highest activity
+	def pop(self):
+
+		self.removals += 1
+		heap = self.heap
+		v = heap[0]
+		last = heap.pop()
+		self.positions[v] = -1
+
+		if heap:
+			heap[0] = last
+			self.down(0)
+
+		return v
+
+
+	# Bumps the activity of a variable involved in a conflict
+	def bump(self, v):
+
+		self.scores[v] += self.increment
+
+		# Rescale everything before the activities overflow
+		if self.scores[v] > 1e100:
+			self.scores = [ score * 1e-100 for score in self.scores ]
+			self.increment *= 1e-100
+
+		if self.positions[v] != -1:
+			self.updates += 1
+			self.up(self.positions[v])
+
+
+	# Adds the variables of a Formula which grew up to n
+	# variables, with no activity yet
+	def grow(self, n):
+
+		for v in xrange(len(self.scores), n + 1):
+			self.scores.append(0.0)
+			self.positions.append(-1)
+			self.phases.append(1)
+			self.insert(v)
+
+
+	# Decays all activities after a conflict
+	def conflict(self):
+		self.increment /= self.decay
+
+
+	# Saves the phase of a variable which is unassigned (unless
+	# save is False) on backtrack and puts it back in the heap
+	def unassign(self, x, save = True):
+		if save:
+			self.phases[abs(x)] = 1 if x > 0 else 2
+		self.insert(abs(x))
+
+
+	# Returns the unassigned literal with the highest activity
+	# in its saved phase
+	def best(self):
+
+		values = self.formula.values
+
+		while values[self.heap[0]] != 0:
+			self.pop()
+
+		v = self.heap[0]
+		return self.formula.literal(v if self.phases[v] == 1 else -v)
+
+
+
 # ======= Heuristics ========= #
 
 # HEURISTIC 1 :
@@ -147,6 +461,9 @@ def variableCountHelper(clauses, id):
 # First Occurrence heuristic
 # Simply returns the first literal in the list
 def firstLiteral(cnf):
+	# A trail Formula finds it without building its clauses
+	if getattr(cnf, "first", None) != None:
+		return cnf.first()
 	return cnf.getLiterals()[0]
 	
 
@@ -165,8 +482,11 @@ def randomLiteral(cnf):
 # clauses of minimum size
 def moms(cnf):
 
+	if getScores(cnf) != None:
+		return getScores(cnf).best("moms")
+
 	# Step 1 : Find Clause with Minimum Size
-	minc = minClauses(cnf.clauses)
+	minc = minCNFClauses(cnf)
 
 	# Step 2 : Find the literal with maximum occurrence
 	return literalCountHelper(minc, "moms")
@@ -180,8 +500,11 @@ def moms(cnf):
 # [f(x) + f(-x)] * 2^k + [f(x) * f(-x)]
 def momsf(cnf):
 
+	if getScores(cnf) != None:
+		return getScores(cnf).best("momsf")
+
 	# Step 1 : Find Clauses with Minimum Size
-	minc = minClauses(cnf.clauses)
+	minc = minCNFClauses(cnf)
 
 	# Step 2 : Find the variable with maximum score [f(x) + f(-x)] * 2^k + [f(x) * f(-x)]
 	return variableCountHelper(minc, "momsf")
@@ -193,8 +516,11 @@ def momsf(cnf):
 # Counts the positive x and negative x for each variable x
 def posit(cnf):
 
+	if getScores(cnf) != None:
+		return getScores(cnf).best("posit")
+
 	# Step 1 : Find Clauses with Minimum Size
-	minc = minClauses(cnf.clauses)
+	minc = minCNFClauses(cnf)
 
 	# Step 2 : Find the variable with maximum occurrence (like dlcs)
 	return variableCountHelper(minc, "dlcs")
@@ -206,8 +532,11 @@ def posit(cnf):
 # Counts the negative occurrences only of each given variable x
 def ZM(cnf):
 
+	if getScores(cnf) != None:
+		return getScores(cnf).best("zm")
+
 	# Step 1 : Find Clauses with Minimum Size
-	minc = minClauses(cnf.clauses)
+	minc = minCNFClauses(cnf)
 
 	# Step 2 : 
 	options = [ l for clause in minc for l in clause.literals ]
@@ -238,6 +567,10 @@ def ZM(cnf):
 # Here we select the variable maximizing Cp+Cn
 # And return x if Cp > Cn otherwise -x
 def dlcs(cnf):
+	if getIndex(cnf) != None:
+		return getIndex(cnf).best("dlcs")
+	if getScores(cnf) != None:
+		return getScores(cnf).best("dlcs")
 	return variableCountHelper(cnf.clauses, "dlcs")
 
 
@@ -247,6 +580,10 @@ def dlcs(cnf):
 # Choose the variable and value that satisfies the maximum number of unsatisfied clauses
 # Like DLCS but we only consider the literal l (Thus Cp and Cn are individual)
 def dlis(cnf):
+	if getIndex(cnf) != None:
+		return getIndex(cnf).best("dlis")
+	if getScores(cnf) != None:
+		return getScores(cnf).best("dlis")
 	return literalCountHelper(cnf.clauses, "dlis")
 
 
@@ -257,6 +594,10 @@ def dlis(cnf):
 # For each literal compute J(l) = \sum{l in clause c} 2^{-|c|}
 # Return the literal maximizing J
 def jw(cnf):
+	if getIndex(cnf) != None:
+		return getIndex(cnf).best("jw")
+	if getScores(cnf) != None:
+		return getScores(cnf).best("jw")
 	return literalCountHelper(cnf.clauses, "jw")
 
 
@@ -267,9 +608,98 @@ def jw(cnf):
 # We need to keep track of them separately
 # as we return x if J(x) >= J(-x) otherwise -x
 def jw2(cnf):
+	if getIndex(cnf) != None:
+		return getIndex(cnf).best("jw2")
+	if getScores(cnf) != None:
+		return getScores(cnf).best("jw2")
 	return variableCountHelper(cnf.clauses, "jw2")
 
 
+# HEURISTIC 11 :
+# -----
+# VSIDS (Variable State Independent Decaying Sum) heuristic
+# Returns the unassigned variable with the highest activity
+# in the value it had the last time it was assigned
+#
+# Activities are bumped by the conflict analysis of a trail
+# Formula (see Activity). A simple CNF has no conflict analysis
+# and uses the occurrences of the variables like dlcs.
+def vsids(cnf):
+
+	if not hasattr(cnf, "activity"):
+		return variableCountHelper(cnf.clauses, "dlcs")
+
+	if cnf.activity == None:
+		cnf.activity = Activity(cnf)
+
+	return cnf.activity.best()
+
+
+# HEURISTIC 12 :
+# -----
+# Lookahead heuristic
+# Only the variables with the highest two sided Jeroslow-Wang
+# score are examined : both values of each one are assigned and
+# propagated. r(x) counts the clauses which lose a literal, i.e.
+# the clauses containing the negation of a propagated literal,
+# and the variable maximizing r(x) * r(-x) is chosen
+# (in the value shrinking the most clauses)
+#
+# A failed literal (whose propagation finds an empty clause) must
+# be False : the opposite value is assigned on the current level
+# (see refute) and the other candidates are still probed. None is
+# then returned instead of a split, so that the solver checks the
+# CNF again and the heuristic scores the simplified CNF. With Unit
+# Propagation, so are the units propagated before probing.
+def lookahead(cnf):
+
+	# Probes start from a CNF without unit clauses
+	if unit:
+		cnf.unitPropagate()
+	if cnf.emptyClause() or cnf.isEmpty():
+		return None
+
+	best, choice = -1, None
+	forced = False
+	literals, count = candidates(cnf, lookaheads)
+
+	# Clauses losing a literal when the literals are True
+	shrunk = lambda assigned : sum( count(x[1:] if x[0] == '-' else '-' + x) for x in assigned )
+
+	for literal in literals:
+
+		if forced and not unassigned(cnf, literal):
+			continue
+
+		scores = []
+
+		for value in [True, False]:
+
+			failed, assigned = probe(cnf, literal, value)
+
+			if failed:
+				refute(cnf, literal, value, failed)
+				forced = True
+				break
+
+			scores.append(shrunk(assigned))
+
+		# Nothing is left to probe
+		if forced and (cnf.emptyClause() or cnf.isEmpty()):
+			return None
+		if len(scores) < 2:
+			continue
+
+		positive, negative = scores
+		score = 1024 * positive * negative + positive + negative
+
+		if score > best:
+			best = score
+			choice = literal if positive >= negative else negation(cnf, literal)
+
+	return None if forced else choice
+
+
 # ======== List =========== #
 
 # Global variable with all heuristics
@@ -282,6 +712,8 @@ heuristics = { "firstLiteral": firstLiteral,
 			   "jw2": jw2,
 			   "dlcs": dlcs,
 			   "dlis" : dlis,
-			   "zm" : ZM
+			   "zm" : ZM,
+			   "vsids" : vsids,
+			   "lookahead" : lookahead
 			  }
 
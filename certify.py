@@ -0,0 +1,160 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Certifies the results of the solver : a model is checked
+# against the clauses of the original CNF and the CDCL solver
+# writes a DRAT proof of unsatisfiability which can be checked
+# by an external proof checker such as drat-trim :
+#
+#	python main.py file.cnf --cdcl --proof=file.drat
+#	drat-trim file.cnf file.drat
+#
+
+import time
+
+
+# Bytes of proof kept in memory before they are written
+buffering = 1 << 16
+
+
+# Checks a model against the clauses of a Packed CNF
+# in a single pass over its literals
+#
+# @param packed : the Packed CNF
+# @param solution : the literals assigned to True as strings
+#                   (variables without value are False)
+#
+# @return the first clause which is not satisfied or None
+#
+def verify(packed, solution):
+
+	values = bytearray([2]) * (packed.variables + 1)
+
+	for x in solution:
+		x = int(x)
+		if abs(x) <= packed.variables:
+			values[abs(x)] = 1 if x > 0 else 2
+
+	literals, offsets = packed.literals, packed.offsets
+
+	for i in xrange(len(offsets) - 1):
+
+		for k in xrange(offsets[i], offsets[i + 1]):
+			x = literals[k]
+			if values[abs(x)] == (1 if x > 0 else 2):
+				break
+
+		else:
+			return list(packed.clause(i))
+
+	return None
+
+
+
+# A Proof writes the clauses learned and deleted by the CDCL
+# solver in the DRAT format : one clause per line ending with 0,
+# deleted clauses start with d and the empty clause ends the
+# proof of an unsatisfiable CNF
+#
+# Lines are joined in memory and written once buffering bytes
+# are reached
+#
+# @field file : the file of the proof
+# @field lines : lines not written yet
+# @field pending : bytes of the lines not written yet
+# @field added : number of clauses added
+# @field deleted : number of clauses deleted
+# @field size : bytes written
+# @field time : seconds spent writing the proof
+#
+class Proof:
+
+	# ========= Fields =========== #
+
+	file = None
+	lines = []
+	pending = 0
+	added = 0
+	deleted = 0
+	size = 0
+	time = 0
+
+	# ====== Constructors ======== #
+
+	# Proof Constructor
+	# Takes the path of the proof
+	def __init__(self, path):
+
+		self.file = open(path, "w")
+		self.lines = []
+		self.pending = 0
+		self.added, self.deleted = 0, 0
+		self.size = 0
+		self.time = 0
+
+	# ======== Methods =========== #
+
+	# Adds a line, writes the lines once enough are kept
+	def write(self, line):
+
+		start = time.time()
+
+		self.lines.append(line)
+		self.pending += len(line)
+
+		if self.pending >= buffering:
+			self.flush()
+
+		self.time += time.time() - start
+
+
+	# Writes the lines kept in memory
+	def flush(self):
+
+		self.file.write(''.join(self.lines))
+		self.size += self.pending
+		self.lines = []
+		self.pending = 0
+
+
+	# Adds a clause implied by the clauses so far
+	# @param clause : the encoded literals of the clause
+	def add(self, clause):
+		self.added += 1
+		self.write(' '.join([ str(x) for x in clause ] + ["0\n"]))
+
+
+	# Deletes a clause
+	# @param clause : the encoded literals of the clause
+	def delete(self, clause):
+		self.deleted += 1
+		self.write(' '.join(["d"] + [ str(x) for x in clause ] + ["0\n"]))
+
+
+	# Writes the remaining lines and closes the file
+	def close(self):
+
+		start = time.time()
+
+		self.flush()
+		self.file.close()
+
+		self.time += time.time() - start
+
+
+	# Displays the size of the proof and the time spent
+	# writing it compared to the time spent solving
+	def info(self, elapsed):
+
+		print " Proof : \n-----------"
+		print " %r clauses added, %r deleted, %r bytes written to %s " % (self.added, self.deleted,
+			self.size, self.file.name)
+		print " Written in %r seconds (%r%% of the solving time) " % (round(self.time, 4),
+			round(100 * self.time / elapsed, 2) if elapsed > 0 else 0)
+		print
@@ -11,7 +11,36 @@
 #
 
 import logic
-import re
+import mmap
+import time
+import os
+import sys
+import struct
+import hashlib
+import tempfile
+import gzip
+import bz2
+import subprocess
+from array import array
+
+try:
+	import lzma
+except ImportError:
+	try:
+		from backports import lzma
+	except ImportError:
+		# xz files are decompressed by the xz command
+		lzma = None
+
+
+# Header of a cached CNF : magic, size of an integer, byte order,
+# largest variable, number of variables, number of literals,
+# number of offsets and length of the comments
+header = struct.Struct("=4sBc2xqqqqq")
+magic = "SKB1"
+
+# Folder of the cached CNFs read when no other folder is given
+folder = ".cnfcache"
 
 # Generates a CNF from a string according
 # to the DIMACS format used in SAT competitions
@@ -20,92 +49,420 @@ import re
 # @param heuristic : heuristic to be used for the branching step
 # @param showInfo : whether to show additional info
 # @param showComments : whether to show string comments
+# @param packed : whether to return a Packed CNF
 #
-# @return whether cnf is satisfiable or not
+# @return the CNF
 #
-def generate(string, heuristic, showInfo, showComments):
+def generate(string, heuristic, showInfo, showComments, packed = False):
+	return stream(string.splitlines(), heuristic, showInfo, showComments, packed)
 
-	# STEP 0 :
-	# -----
-	# Sanitize
-	# Either using 0's or line breaks
 
-	# replace multiple spaces by a single one
-	clean = re.sub('[ ]+', ' ', string)
+# Opens a DIMACS file, which can be compressed with gzip, bzip2
+# or xz : compressed files are recognized by their first bytes
+# and decompressed line by line while they are parsed
+#
+# @param path : path of the file
+#
+# @return a file object over the lines of the file
+#
+def openFile(path):
+
+	# The first bytes of a pipe can not be read twice
+	if not os.path.isfile(path):
+		return open(path)
 
-	# remove leading spaces
-	clean = re.sub('^[ ]+', '', clean, flags=re.MULTILINE)
+	with open(path, "rb") as f:
+		start = f.read(6)
 
-	# split the string into lines and filter empty lines
-	lines = filter(lambda l : l not in [' ',''] , clean.strip().split('\n'))
+	if start.startswith("\x1f\x8b"):
+		return gzip.GzipFile(path)
 
+	if start.startswith("BZh"):
+		return bz2.BZ2File(path)
 
-	# STEP 1 :
-	# -----
-	# Get comments and info and display them to user
-	comments = filter(lambda l : l[0] in ['p', 'c'], lines)
-	if comments and showComments :
-		print " Comments : \n-----------"
-		print '\n'.join(map(lambda x : ' ' + x[1:].strip(), comments))
-		print 
+	if start == "\xfd7zXZ\x00":
+		if lzma != None:
+			return lzma.LZMAFile(path)
 
+		# Without lzma the lines are read from the output of xz
+		try:
+			return Pipe(["xz", "-dc", path], path)
+		except OSError:
+			raise IOError("Reading xz files requires the lzma module (backports.lzma on Python 2) or the xz command")
 
-	# STEP 2 :
-	# -----
-	# Get the actual CNF
-	cnf = lines[len(comments):]
+	return open(path)
 
 
-	# STEP 3 :
-	# -----
-	# Split into clauses
-	# Either using the 0 character or line breaks (search in clean)
-	if re.search('[ ]+0[ ]*', clean):
-		
-		# 0's are used for the end of clause rather than \n
-		cnf = ' '.join(cnf)
-		cnf = re.sub('[ ]+0[ ]*','\n', cnf)
-		cnf = filter(lambda l : l not in [' ',''] , cnf.strip().split('\n'))
+# A Pipe reads the lines written by a command, such as
+# the decompressed lines of a file
+#
+# The exit status of the command is checked once all lines
+# are read, so that a file which could only be decompressed
+# in part is never parsed as a whole formula
+#
+# @field command : the command and its arguments
+# @field name : path of the file, so that it can be cached
+# @field process : the process running the command
+#
+class Pipe:
 
+	# ========= Fields =========== #
 
-	# STEP 4 :
-	# -----
-	# create a variables for each absolute number
-	
-	# get absolute numbers
-	snumbers = ' '.join(cnf).split(' ')
-	numbers = map(lambda x : int(x), snumbers)
-	absolutes = map(lambda x : abs(x), numbers)
+	command = []
+	name = ""
+	process = None
 
-	# create variables from absolute numbers
-	variables = { i : logic.Var(i) for i in set(absolutes) }
+	# ====== Constructors ======== #
 
+	# Pipe Constructor
+	# Starts the command
+	def __init__(self, command, name):
+		self.command = command
+		self.name = name
+		self.process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-	# STEP 5 :
-	# -----
-	# create a literal for each number from the variables
-	literals = { i : logic.Literal(variables[abs(i)], (i >= 0)) for i in set(numbers) }
+	# ======== Methods =========== #
 
+	# Iterates over the lines of the command
+	# and closes the Pipe after the last one
+	def __iter__(self):
 
-	# STEP 6 :
-	# -----
-	# create a clause for each line
-	sclauses = [ x.split(' ') for x in cnf ]
-	clauses = [ logic.Clause(map(lambda x : literals[int(x)], line)) for line in sclauses ]
+		for line in self.process.stdout:
+			yield line
+
+		self.close()
+
+
+	# Stops reading and waits for the command
+	# Raises an IOError if the command failed (a command
+	# stopped before the end of its output is not an error)
+	def close(self):
+
+		# Already closed
+		if self.process.stderr.closed:
+			return
+
+		self.process.stdout.close()
+		error = self.process.stderr.read()
+		self.process.stderr.close()
+
+		if self.process.wait() > 0:
+			raise IOError("%s failed on %s : %s" % (self.command[0], self.name, error.strip()))
+
+
+	# The Pipe is closed at the end of a with statement
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+# Generates a CNF from a DIMACS file
+# The file is memory-mapped when possible so that
+# it is never read into a single string
+#
+# @param f : file object of the input CNF
+# @param heuristic : heuristic to be used for the branching step
+# @param showInfo : whether to show additional info
+# @param showComments : whether to show file comments
+# @param packed : whether to return a Packed CNF
+# @param comments : list receiving the comments or None
+#
+# @return the CNF
+#
+def load(f, heuristic, showInfo, showComments, packed = False, comments = None):
+
+	try:
+		# Only plain files are mapped, compressed files are
+		# decompressed while they are parsed
+		if not isinstance(f, file):
+			raise TypeError("Compressed file")
+		buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+	except Exception:
+		# Pipes and empty files can not be mapped
+		return stream(f, heuristic, showInfo, showComments, packed, comments)
+
+	try:
+		return stream(iter(buffer.readline, ''), heuristic, showInfo, showComments, packed, comments)
+	finally:
+		buffer.close()
+
+
+# Generates a CNF from lines in DIMACS format
+# in a single pass : each line is tokenized and its
+# literals are directly appended to a flat array
+#
+# Clauses are delimited either using 0's or line breaks :
+# as soon as a 0 is found, all literals read so far
+# belong to the clause it terminates
+#
+# Fewer clauses than announced by the p cnf line raise a
+# ValueError : the input was cut off
+#
+# @param lines : iterable over the lines of the input CNF
+# @param heuristic : heuristic to be used for the branching step
+# @param showInfo : whether to show additional info
+# @param showComments : whether to show comments
+# @param packed : whether to return a Packed CNF instead
+#                 of a CNF of Var, Literal and Clause objects
+# @param comments : list receiving the comments or None
+#
+# @return the CNF
+#
+def stream(lines, heuristic, showInfo, showComments, packed = False, comments = None):
+
+	start = time.time()
+	size = 0
+
+	if comments == None:
+		comments = []
+	variables = set()
+
+	# Literals of all clauses and the end of each clause
+	literals = array('i')
+	offsets = array('i', [0])
+
+	# Whether 0's are used for the end of clause rather than \n
+	zeros = False
+
+	# Number of clauses of the p cnf line or None
+	declared = None
+
+	for line in lines:
+
+		size += len(line)
+		tokens = line.split()
+
+		# STEP 1 :
+		# -----
+		# Skip empty lines and keep comments and info
+		if not tokens:
+			continue
+
+		if tokens[0][0] in ['p', 'c']:
+			comments.append(line.strip()[1:].strip())
+
+			if tokens[0] == 'p' and len(tokens) >= 4:
+				declared = int(tokens[3])
+			continue
+
+		# STEP 2 :
+		# -----
+		# Append the literals, a 0 terminates the current clause
+		for number in map(int, tokens):
+
+			if number != 0:
+				literals.append(number)
+				variables.add(abs(number))
+				continue
+
+			# The first 0 also terminates all clauses
+			# delimited by line breaks so far
+			if not zeros:
+				zeros = True
+				del offsets[1:]
+
+			if len(literals) > offsets[-1]:
+				offsets.append(len(literals))
+
+		# STEP 3 :
+		# -----
+		# Without 0's a line break terminates the clause
+		if not zeros and len(literals) > offsets[-1]:
+			offsets.append(len(literals))
 
+	# Remaining literals after the last 0
+	if len(literals) > offsets[-1]:
+		offsets.append(len(literals))
 
-	# STEP 7 :
+	# A file read in part must not be solved as the whole formula
+	if declared != None and len(offsets) - 1 < declared:
+		raise ValueError("Only %d of the %d clauses of the p cnf line were read" % (len(offsets) - 1, declared))
+
+	cnf = logic.Packed(literals, offsets, max(variables or [0]), heuristic)
+
+	if not packed:
+		cnf = cnf.unpack()
+
+	end = time.time()
+
+
+	# STEP 4 :
 	# -----
-	# display info to user
+	# Display comments and info to user
+	if comments and showComments :
+		print " Comments : \n-----------"
+		print '\n'.join(map(lambda x : ' ' + x, comments))
+		print
+
 	if showInfo :
+		elapsed = max(end - start, 1e-6)
 		print " CNF Infos : \n-----------"
-		print " %r variables and %r clauses " % (len(variables), len(clauses))
+		print " %r variables and %r clauses " % (len(variables), len(offsets) - 1)
+		print " Parsed %r bytes in %r seconds (%r MB/s, %r clauses/s) " % (size,
+			round(elapsed, 4), round(size / elapsed / 1e6, 2), int((len(offsets) - 1) / elapsed))
 		print
 
 
-	# STEP 8 :
+	# STEP 5 :
 	# -----
-	# create CNF with empty solutions
-	return logic.CNF(clauses,[], heuristic, [], [])
+	# Return the CNF with empty solutions
+	return cnf
+
+
+# Returns the SHA-1 of the content of a DIMACS file
+# which names its cached CNF (the compressed content
+# for a compressed file)
+def digest(f):
+
+	sha = hashlib.sha1()
+
+	if not os.path.isfile(f.name):
+		raise IOError("Not a regular file")
+
+	with open(f.name, "rb") as raw:
+		for chunk in iter(lambda : raw.read(1 << 20), ''):
+			sha.update(chunk)
+
+	return sha.hexdigest()
+
+
+# Writes a Packed CNF in the binary cache format : the header,
+# the comments and the flat arrays of literals and offsets
+#
+# The file is written under a temporary name and renamed
+# so that no process ever reads half of it
+#
+# @param cnf : the Packed CNF
+# @param comments : comments of the DIMACS file
+# @param path : path of the cached CNF
+#
+def save(cnf, comments, path):
+
+	text = '\n'.join(comments)
+	count = len(set( abs(x) for x in cnf.literals ))
+
+	descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+
+	with os.fdopen(descriptor, "wb") as f:
+		f.write(header.pack(magic, cnf.literals.itemsize, sys.byteorder[0], cnf.variables,
+			count, len(cnf.literals), len(cnf.offsets), len(text)))
+		f.write(text)
+		cnf.literals.tofile(f)
+		cnf.offsets.tofile(f)
+
+	os.rename(temporary, path)
+
+
+# Reads a Packed CNF in the binary cache format
+# The arrays are copied straight out of a memory map
+# of the file without any parsing
+#
+# @param path : path of the cached CNF
+# @param heuristic : heuristic to be used for the branching step
+#
+# @return the Packed CNF, the number of variables and the
+#         comments (or None if the file is not a valid cache
+#         for this machine)
+#
+def read(path, heuristic):
 
+	with open(path, "rb") as f:
+		try:
+			buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except Exception:
+			return None
+
+	try:
+		if len(buffer) < header.size:
+			return None
+
+		tag, itemsize, order, variables, count, n, m, length = header.unpack(buffer[:header.size])
+		literals, offsets = array('i'), array('i')
+
+		# Caches written on another machine are parsed again
+		if tag != magic or itemsize != literals.itemsize or order != sys.byteorder[0]:
+			return None
+		if len(buffer) != header.size + length + (n + m) * itemsize:
+			return None
+
+		start = header.size + length
+		literals.fromstring(buffer[start:start + n * itemsize])
+		offsets.fromstring(buffer[start + n * itemsize:])
+		comments = buffer[header.size:start].split('\n') if length else []
+
+	finally:
+		buffer.close()
+
+	return logic.Packed(literals, offsets, variables, heuristic), count, comments
+
+
+# Generates a CNF from a DIMACS file through a cache
+# of parsed CNFs named by the SHA-1 of the file : the
+# cached CNF is read when present, otherwise the file is
+# parsed with load and the cached CNF is written
+#
+# Without write nothing is written : the file is only
+# hashed if the folder exists
+#
+# @param f : file object of the input CNF
+# @param heuristic : heuristic to be used for the branching step
+# @param showInfo : whether to show additional info
+# @param showComments : whether to show file comments
+# @param packed : whether to return a Packed CNF
+# @param directory : folder of the cached CNFs
+# @param write : whether to write the missing cached CNF
+#
+# @return the CNF
+#
+def cached(f, heuristic, showInfo, showComments, packed, directory = folder, write = True):
+
+	start = time.time()
+
+	if not write and not os.path.isdir(directory):
+		return load(f, heuristic, showInfo, showComments, packed)
+
+	try:
+		path = os.path.join(directory, digest(f) + ".cnf.bin")
+	except Exception:
+		# Pipes can not be read twice
+		# and have no name
+		return load(f, heuristic, showInfo, showComments, packed)
+
+	found = read(path, heuristic) if os.path.exists(path) else None
+
+	if found == None and not write:
+		return load(f, heuristic, showInfo, showComments, packed)
+
+	if found == None:
+		comments = []
+		cnf = load(f, heuristic, showInfo, showComments, True, comments)
+
+		try:
+			if not os.path.isdir(directory):
+				os.makedirs(directory)
+			save(cnf, comments, path)
+		except (IOError, OSError) as err:
+			# The CNF is still solved without cache
+			if showInfo:
+				print " Could not write the cache : %s " % err
+				print
+
+		return cnf if packed else cnf.unpack()
+
+	cnf, count, comments = found
+	end = time.time()
+
+	if comments and showComments :
+		print " Comments : \n-----------"
+		print '\n'.join(map(lambda x : ' ' + x, comments))
+		print
+
+	if showInfo :
+		print " CNF Infos : \n-----------"
+		print " %r variables and %r clauses " % (count, cnf.size())
+		print " Loaded %s in %r seconds " % (path, round(end - start, 4))
+		print
 
+	return cnf if packed else cnf.unpack()
@@ -0,0 +1,115 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Keeps a single CDCL solver alive to answer many related
+# questions about a formula : clauses are added over time
+# and every query is solved under assumptions
+#
+# Example :
+#
+#	s = incremental.Solver([[1, 2], [-1, 3]])
+#	s.solve([-3, -2])      # False
+#	s.addClause([-2, 4])
+#	s.solve()              # True
+#	s.model()              # [-1, 2, -3, 4]
+#
+
+import logic
+import solver
+import trail
+from array import array
+
+
+# Solver answers queries with solver.solveCDCL on a single
+# Formula, so learned clauses, the activities of the VSIDS
+# heuristic and the saved phases are kept from one query
+# to the next
+#
+# Literals are encoded as integers (x or -x)
+#
+# @field formula : the Formula being solved
+# @field restarts : name of the restart schedule or None
+# @field splits : number of total splits and unsuccessful splits
+#                 over all queries
+# @field queries : number of calls of solve
+# @field satisfiable : result of the last query or None
+#
+class Solver:
+
+	# ========= Fields =========== #
+
+	formula = None
+	restarts = None
+	splits = []
+	queries = 0
+	satisfiable = None
+
+	# ====== Constructors ======== #
+
+	# Solver Constructor
+	# Takes the initial clauses as lists of integers
+	def __init__(self, clauses = [], heuristic = "vsids", restarts = "luby", indexed = False):
+
+		literals = array('i')
+		offsets = array('i', [0])
+
+		for clause in clauses:
+			literals.extend(clause)
+			offsets.append(len(literals))
+
+		packed = logic.Packed(literals, offsets, max([ abs(x) for x in literals ] or [0]), heuristic)
+
+		self.formula = trail.Formula(packed, indexed)
+		self.restarts = restarts
+		self.splits = [0, 0]
+		self.queries = 0
+		self.satisfiable = None
+
+	# ======== Methods =========== #
+
+	# Adds a clause for every following query
+	def addClause(self, clause):
+		self.formula.addClause(list(clause))
+		self.satisfiable = None
+
+
+	# Returns whether the formula is satisfiable
+	# when every assumption is True
+	def solve(self, assumptions = []):
+
+		self.formula.grow(max([ abs(x) for x in assumptions ] or [0]))
+		self.queries += 1
+
+		sat = solver.solveCDCL(self.formula, False, True, self.splits, self.restarts, list(assumptions))
+		self.satisfiable = bool(sat)
+
+		return self.satisfiable
+
+
+	# Returns the value of a literal in the model
+	# found by the last query (None if unassigned)
+	def value(self, x):
+
+		if not self.satisfiable:
+			raise ValueError("The last query was not satisfiable")
+
+		if abs(x) >= len(self.formula.values):
+			return None
+		return self.formula.value(x)
+
+
+	# Returns the model found by the last query, listing
+	# every variable (unassigned ones take False)
+	def model(self):
+
+		if not self.satisfiable:
+			raise ValueError("The last query was not satisfiable")
+
+		values = self.formula.values
+		return [ v if values[v] == 1 else -v for v in xrange(1, len(values)) ]
@@ -11,8 +11,11 @@
 # the SAT solver
 #
 
+import bisect
 import random
 import branching
+from array import array
+from collections import defaultdict, deque
 
 
 # Var represents a variable
@@ -163,7 +166,7 @@ class Clause:
 # A CNF is a conjunction of clauses
 #
 # @field clauses : list of clauses
-# @field solution : keeps track of positively assigned literals
+# @field solution : keeps track of the literals assigned to True
 # @field heuristic : the name of the heuristic used for the
 #                    branching step
 # @field units : contains literals determined by unitPropagation
@@ -243,7 +246,7 @@ class CNF:
 
 
 	# Returns the solution
-	# a list of positively assigned literals
+	# a list of the literals assigned to True
 	def solutions(self):
 
 		# Sort the solution by absolute value
@@ -251,6 +254,21 @@ class CNF:
 			key=lambda x: abs(int(x)))
 
 
+	# Creates the Packed CNF of the clauses
+	# (the inverse of Packed.unpack)
+	def pack(self):
+
+		literals = array('i')
+		offsets = array('i', [0])
+
+		for clause in self.clauses:
+			literals.extend([ l.variable.identifier if l.polarity else -l.variable.identifier
+				for l in clause.literals ])
+			offsets.append(len(literals))
+
+		return Packed(literals, offsets, max([ abs(x) for x in literals ] or [0]), self.heuristic)
+
+
 	# Simplify CNF using the assignment of literals
 	# according to the following rules
 	def simplify(self):
@@ -269,9 +287,8 @@ class CNF:
 	# and simplifies the CNF directly afterwards
 	def assign(self, literal, value):
 
-		# 1. Save the assignment in the solutions
-		if value:
-			self.solution.append(str(literal))
+		# 1. Save the literal which becomes TRUE in the solutions
+		self.solution.append(str(literal) if value else str(Literal(literal.variable, not literal.polarity)))
 
 		# 2. Simplify the CNF
 		literal.assign(value)
@@ -285,30 +302,104 @@ class CNF:
 	# Unite Propagation
 	# Removes all unit clauses (clauses with one literal)
 	# required in STEP 1a
+	#
+	# Uses two watched literals per clause : a clause only
+	# has to be visited when one of its watched literals
+	# becomes false. The CNF is simplified once at the end
+	# instead of after every single unit.
 	def unitPropagate(self):
 
-		# Iterate until we have no more unit clauses
-		while True:
+		# Value of each variable implied so far
+		values = {}
+
+		# Watch lists : (variable, polarity) -> [clause, i, j]
+		# where i and j are the positions of the watched literals
+		watches = {}
+
+		# Literals assigned to True, in propagation order
+		queue = []
 
-			# Keep track whether we found a unit
-			found = False
+		# Returns the value of a literal under values
+		def value(literal):
+			v = values.get(literal.variable)
+			return None if v == None else v == literal.polarity
 
-			for clause in self.clauses:
+		# Assigns a literal to True and queues it
+		# Returns False if the literal is already False
+		def enqueue(literal):
+			v = value(literal)
+			if v == None:
+				values[literal.variable] = literal.polarity
+				self.units.append(str(literal))
+				queue.append(literal)
+			return v != False
+
+		# STEP 1 : watch the first two literals of every clause
+		# and enqueue the literals of unit clauses
+		conflict = False
+
+		for clause in self.clauses:
 
-				# Returns the unit if it exists otherwise False
-				unit = clause.unit()
+			if len(clause.literals) > 1:
+				watch = [clause, 0, 1]
+				for l in clause.literals[:2]:
+					watches.setdefault((l.variable, l.polarity), []).append(watch)
 
-				# If we have a unit literal,
-				# assign it to True (this removes the corresponding clause)
-				if unit :
+			elif len(clause.literals) == 1:
+				conflict = conflict or not enqueue(clause.literals[0])
 
-					self.units.append(str(unit))
-					self.assign(unit, True)
-					found = True
+		# STEP 2 : propagate every assigned literal
+		# by visiting only the clauses watching its negation
+		head = 0
+		while not conflict and head < len(queue):
 
-			# break the while loop if we did not find
-			# any more unit literals or we have an empty clause
-			if self.emptyClause() or not found : return
+			literal = queue[head]
+			head += 1
+
+			watching = watches.get((literal.variable, not literal.polarity), [])
+			kept = []
+
+			for index, watch in enumerate(watching):
+
+				clause, i, j = watch
+				literals = clause.literals
+
+				# Make i the position of the false watched literal
+				if literals[j].variable == literal.variable and literals[j].polarity != literal.polarity:
+					i, j = j, i
+
+				# Clause already satisfied by the other watch
+				if value(literals[j]):
+					kept.append(watch)
+					continue
+
+				# Look for a replacement which is not False
+				for k in xrange(len(literals)):
+					if k != i and k != j and value(literals[k]) != False:
+						watch[1], watch[2] = k, j
+						watches.setdefault((literals[k].variable, literals[k].polarity), []).append(watch)
+						break
+
+				else:
+					# No replacement : the clause is unit or empty
+					kept.append(watch)
+					if not enqueue(literals[j]):
+						conflict = True
+						kept.extend(watching[index + 1:])
+						break
+
+			watches[(literal.variable, not literal.polarity)] = kept
+
+		# STEP 3 : save the units in the solution and
+		# simplify the CNF once (a conflict leaves an empty clause)
+		for literal in queue:
+			self.solution.append(str(literal))
+			literal.assign(True)
+
+		self.simplify()
+
+		for literal in queue:
+			literal.unassign()
 
 
 	# Returns whether a literal is Pure
@@ -322,29 +413,200 @@ class CNF:
 		return True
 
 
+	# Returns the pure literals of the CNF in the order in
+	# which Pure Elimination assigns them
+	#
+	# Keeps the number of occurrences of both polarities of every
+	# variable : assigning a pure literal removes its clauses and
+	# the literals whose opposite no longer occurs become pure.
+	# The next pure literal is the first one of the set of the
+	# remaining literals, as if every literal of that set were
+	# tested with isPure, so that the same literals are found in
+	# the same order. The order of a set depends on the order in
+	# which its literals are inserted : the literals are kept in
+	# the order of their first occurrence in the remaining clauses
+	# and the set is only built when several literals are pure.
+	#
+	# @return the pure literals and the clauses they satisfy
+	def findPures(self):
+
+		clauses = self.clauses
+
+		# Occurrences of each literal : (variable, polarity) -> count
+		counts = defaultdict(int)
+		occurs = defaultdict(list)
+		reference = {}
+
+		# Positions (clause, literal) of the occurrences of each
+		# Literal object, and the Literal objects sorted by their
+		# first occurrence in the remaining clauses
+		positions = {}
+		firsts, order = [], []
+
+		for i, clause in enumerate(clauses):
+			for j, l in enumerate(clause.literals):
+				key = (l.variable, l.polarity)
+				counts[key] += 1
+				occurs[key].append(i)
+				reference.setdefault(key, l)
+
+				if id(l) not in positions:
+					positions[id(l)] = deque()
+					firsts.append((i, j))
+					order.append(l)
+				positions[id(l)].append((i, j))
+
+		pures = []
+		removed = set()
+		candidates = set([ key for key in counts if counts.get((key[0], not key[1]), 0) == 0 ])
+
+		while candidates:
+
+			if len(candidates) == 1:
+				literal = reference[next(iter(candidates))]
+			else:
+				literal = next(l for l in set(order) if (l.variable, l.polarity) in candidates)
+
+			pures.append(literal)
+
+			for i in occurs[(literal.variable, literal.polarity)]:
+
+				if id(clauses[i]) in removed:
+					continue
+
+				removed.add(id(clauses[i]))
+
+				for l in clauses[i].literals:
+					key = (l.variable, l.polarity)
+					counts[key] -= 1
+
+					if counts[key] == 0:
+						candidates.discard(key)
+
+						# The opposite literal became pure
+						opposite = (l.variable, not l.polarity)
+						if counts[opposite] > 0:
+							candidates.add(opposite)
+
+					# Move the Literal object to its next occurrence
+					queue = positions[id(l)]
+					if not queue or queue[0][0] != i:
+						continue
+
+					k = bisect.bisect_left(firsts, queue[0])
+					del firsts[k], order[k]
+
+					while queue and id(clauses[queue[0][0]]) in removed:
+						queue.popleft()
+
+					if queue:
+						k = bisect.bisect_left(firsts, queue[0])
+						firsts.insert(k, queue[0])
+						order.insert(k, l)
+
+		return pures, removed
+
+
 	# Pure Elimination : Pure Clauses can be removed
 	# Just set the pure literals to true
 	# required in STEP 1b
 	def pureEliminate(self):
 
-		# Force re-computation of literals
-		# until no more found
+		pures, removed = self.findPures()
+
+		for literal in pures:
+			self.solution.append(str(literal))
+			self.pures.append(str(literal))
+
+		# Pure literals are never FALSE : only remove their clauses
+		if pures:
+			self.clauses = [ clause for clause in self.clauses if id(clause) not in removed ]
+
+
+
+# A Packed CNF is a compact representation of a CNF
+# without any Var, Literal or Clause object
+#
+# Literals are encoded as integers (x or -x) and all clauses
+# are stored one after the other in a single flat array :
+# clause i is literals[offsets[i]:offsets[i + 1]]
+#
+# @field literals : array of the literals of all clauses
+# @field offsets : array of the start of each clause
+#                  followed by the end of the last clause
+# @field variables : the highest variable
+# @field heuristic : the name of the heuristic used for the
+#                    branching step
+#
+class Packed:
+
+	# ========= Fields =========== #
+
+	literals = array('i')
+	offsets = array('i', [0])
+	variables = 0
+	heuristic = ""
+
+	# ====== Constructors ======== #
+
+	# Packed CNF Constructor
+	def __init__(self, literals, offsets, variables, heuristic):
+		self.literals = literals
+		self.offsets = offsets
+		self.variables = variables
+		self.heuristic = heuristic
+
+
+	# Representation for humans
+	def __repr__(self):
+		return str([ list(self.clause(i)) for i in xrange(self.size()) ])
+
+	# ======== Methods =========== #
+
+	# Returns the number of clauses
+	def size(self):
+		return len(self.offsets) - 1
+
+
+	# Returns the literals of clause i
+	def clause(self, i):
+		return self.literals[self.offsets[i]:self.offsets[i + 1]]
+
+
+	# Returns whether the CNF contains an empty clause
+	def emptyClause(self):
+
+		for i in xrange(self.size()):
+			if self.offsets[i] == self.offsets[i + 1]:
+				return True
+		return False
+
+
+	# Creates the CNF of Var, Literal and Clause objects
+	# with a single Literal for each integer
+	def unpack(self):
+
+		variables = {}
+		literals = {}
+		clauses = []
+
+		for i in xrange(self.size()):
+
+			clause = []
+
+			for number in self.clause(i):
 
-		found = True
-		while found:
+				if number not in literals:
 
-			found = False
+					if abs(number) not in variables:
+						variables[abs(number)] = Var(abs(number))
 
-			# Remove duplicates
-			for literal in set(self.getLiterals()):
+					literals[number] = Literal(variables[abs(number)], number > 0)
 
-				if self.isPure(literal):
+				clause.append(literals[number])
 
-					# Assign this literal to be true
-					self.assign(literal, True)
-					self.pures.append(str(literal))
-					found = True
+			clauses.append(Clause(clause))
 
-					break
+		return CNF(clauses, [], self.heuristic, [], [])
 
 
@@ -17,6 +17,14 @@ import convert
 import time
 import getopt
 import branching
+import trail
+import parallel
+import metrics
+import preprocess
+import symmetry
+import vectorized
+import certify
+import logic
 
 
 # STEP 1 :
@@ -32,7 +40,7 @@ if len(sys.argv) < 2:
 # -----
 # Retrieve all optional arguments
 try:
-	optlist, args = getopt.getopt(sys.argv[2:], '', ['heuristic=','comments','info','help','pure', 'unit'])
+	optlist, args = getopt.getopt(sys.argv[2:], '', ['heuristic=','comments','info','help','pure', 'unit', 'trail', 'iterative', 'cdcl', 'packed', 'index', 'numpy', 'portfolio', 'configurations=', 'cubes=', 'k=', 'metrics', 'progress=', 'restarts=', 'learned=', 'memory=', 'preprocess', 'symmetry', 'cache=', 'timeout=', 'maxsplits=', 'maxconflicts=', 'maxmemory=', 'proof='])
 
 except getopt.GetoptError as err:
 	# Display the error
@@ -46,6 +54,13 @@ except getopt.GetoptError as err:
 
 # Set default values for all options
 heuristic, comments, info, _help, pure, unit = "firstLiteral", False, False, False, False, False
+_trail, iterative, cdcl, packed, index, vectorize = False, False, False, False, False, False
+portfolio, configurations, cubes = False, parallel.configurations, 0
+_metrics, progress, restarts = False, 0, None
+learned, memory, _preprocess, _symmetry = None, None, False, False
+cache = None
+proof = None
+budget, unknown = None, None
 
 # Iterate over optional arguments
 for option, value in optlist:
@@ -53,7 +68,8 @@ for option, value in optlist:
 		heuristic = value
 
 		# Also set constants for some heuristics
-		if value == "momsf":
+		# unless given with --k
+		if value == "momsf" and not any(o == "--k" for o, v in optlist):
 
 			inp = 0
 			while inp == 0:
@@ -61,6 +77,39 @@ for option, value in optlist:
 
 			branching.setK(inp)
 
+	elif option == "--k":
+		branching.setK(int(value))
+	elif option == "--restarts":
+		cdcl, restarts = True, value
+
+		if value not in solver.schedules:
+			print "ERROR : The restart schedule %s does not exist" % value
+			exit(0)
+
+	elif option == "--learned":
+		learned = int(value)
+	elif option == "--memory":
+		memory = int(float(value) * 1024 * 1024)
+	elif option in ["--timeout", "--maxsplits", "--maxconflicts", "--maxmemory"]:
+		budget = budget or solver.Budget()
+		if option == "--timeout":
+			budget.seconds = float(value)
+		elif option == "--maxsplits":
+			budget.splits = int(value)
+		elif option == "--maxconflicts":
+			budget.conflicts = int(value)
+		else:
+			budget.memory = int(float(value) * 1024 * 1024)
+	elif option == "--cache":
+		cache = value
+	elif option == "--preprocess":
+		_preprocess = True
+	elif option == "--symmetry":
+		_symmetry = True
+	elif option == "--metrics":
+		_metrics = True
+	elif option == "--progress":
+		_metrics, progress = True, float(value)
 	elif option == "--comments":
 		comments = True
 	elif option == "--info":
@@ -71,10 +120,40 @@ for option, value in optlist:
 		pure = True
 	elif option == "--unit":
 		unit = True
+	elif option == "--trail":
+		_trail = True
+	elif option == "--iterative":
+		iterative = True
+	elif option == "--cdcl":
+		cdcl = True
+	elif option == "--packed":
+		packed = True
+	elif option == "--index":
+		index = True
+	elif option == "--numpy":
+		vectorize = True
+
+		if not vectorized.available():
+			print "ERROR : --numpy needs NumPy to be installed"
+			exit(0)
+	elif option == "--portfolio":
+		portfolio = True
+	elif option == "--configurations":
+		configurations = value.split(',')
+	elif option == "--cubes":
+		cubes = int(value)
+	elif option == "--proof":
+		proof = value
 
 # Display help is needed
 if _help:
-	print "Usage : main.py CNF [--heuristic=...] [--pure] [--unit] [--comments] [--info] [--help]"
+	print "Usage : main.py CNF [--heuristic=...] [--pure] [--unit] [--trail] [--iterative] [--cdcl] [--restarts=...] [--learned=...] [--memory=...] [--preprocess] [--symmetry] [--cache=...] [--timeout=...] [--maxsplits=...] [--maxconflicts=...] [--maxmemory=...] [--proof=...] [--packed] [--index] [--numpy] [--portfolio] [--configurations=...] [--cubes=...] [--k=...] [--metrics] [--progress=...] [--comments] [--info] [--help]"
+	exit(0)
+
+# Only the learned clauses of the CDCL solver
+# solving the original CNF make a proof
+if proof and not (cdcl and not (portfolio or cubes or _preprocess or _symmetry)):
+	print "ERROR : --proof needs --cdcl without --portfolio, --cubes, --preprocess or --symmetry"
 	exit(0)
 
 
@@ -83,25 +162,35 @@ if _help:
 # Open the CNF file
 file = sys.argv[1]
 try:
-	f = open(file)
-	string = f.read()
+	f = convert.openFile(file)
 except Exception as err:
 	# Display the error
 	print "ERROR : Could not read CNF file"
+	print err
 	exit(0)
 
 # Clear terminal 
 print chr(27) + "[2J"
-print "Solving %s using heuristic %s ... \n\n" % (file, heuristic)
+if portfolio:
+	print "Solving %s using %d configurations ... \n\n" % (file, len(configurations))
+else:
+	print "Solving %s using heuristic %s ... \n\n" % (file, heuristic)
 
 
 # STEP 5 :
 # -----
 # Convert the file to a CNF
 try:
-	# Generate CNF from string with heuristic
+	# Generate CNF from the file with heuristic
 	# Also takes comments and info
-	cnf = convert.generate(string, heuristic, info, comments)
+	# The portfolio sends the Packed CNF to every process
+	# and so does the preprocessing
+	# With --cache parsed files are kept for the next runs,
+	# otherwise they are only read from the default folder
+	if cache:
+		cnf = convert.cached(f, heuristic, info, comments, packed or portfolio or _preprocess or _symmetry, cache)
+	else:
+		cnf = convert.cached(f, heuristic, info, comments, packed or portfolio or _preprocess or _symmetry, convert.folder, False)
 except Exception as err:
 	print "ERROR : The CNF file seems to be invalid"
 	print err
@@ -112,16 +201,105 @@ if cnf.emptyClause():
 	print "ERROR : The CNF has already an empty clause"
 	exit(0)
 
+# Keep the clauses of the original CNF to verify the model :
+# a Packed CNF is never modified by the search and a Formula
+# keeps its clauses, the recursive solver and the cubes only
+# replace the literal lists of their clauses
+original = cnf if isinstance(cnf, logic.Packed) else None
+literals = None
+if original == None and (cubes or not (_trail or iterative or cdcl)):
+	literals = [ clause.literals for clause in cnf.clauses ]
+
+# Simplify the Packed CNF, the solution of the original
+# CNF is reconstructed once the simplified one is solved
+if _preprocess:
+	preprocessor = preprocess.Preprocessor(cnf)
+	cnf = simplified = preprocessor.run(heuristic)
+
+	if info:
+		preprocessor.info(simplified)
+
+# Break the symmetries of the CNF with new clauses over
+# new variables, which are removed from the solution
+if _symmetry and not (_preprocess and preprocessor.empty):
+	variables = cnf.variables
+	cnf = symmetry.breakSymmetries(cnf, info)
+
+# The recursive solver needs Var, Literal and Clause objects
+if (packed or _preprocess or _symmetry) and not portfolio and (cubes or not (_trail or iterative or cdcl)):
+	cnf = cnf.unpack()
+
+# The other solvers share a single Formula
+# which can keep an index or NumPy arrays for the heuristics
+if (_trail or iterative or cdcl) and not (portfolio or cubes):
+	cnf = trail.Formula(cnf, index, vectorize)
+	cnf.cap, cnf.memory = learned, memory
+
+	# The learned and deleted clauses are written to the proof
+	if proof:
+		try:
+			cnf.proof = certify.Proof(proof)
+		except IOError as err:
+			print "ERROR : Could not write the proof"
+			print err
+			exit(0)
+
 # Keep track of total splits and failed splits
 splits = [0,0]
 
 
+# Time the methods of the solver in this process
+if _metrics:
+	callback = (lambda m : sys.stdout.write(m.progress() + "\n")) if progress else None
+	_metrics = metrics.Metrics(splits, callback, progress)
+	_metrics.enable()
+
+
 # STEP 6 :
 # -----
 # Solve the CNF and measure performance
+# The search stops with an unknown result once the budget is spent
 start = time.time()
-sat = solver.solve(cnf, pure, unit, splits)
+solver.setBudget(budget)
+try:
+	if _preprocess and preprocessor.empty:
+		sat = False
+	elif portfolio:
+		try:
+			sat, winner = parallel.portfolio(cnf, configurations, splits)
+		except ValueError as err:
+			print "ERROR : %s" % err
+			exit(0)
+		heuristic = winner.split('+')[0]
+	elif cubes:
+		sat = parallel.cubeAndConquer(cnf, cubes, pure, unit, splits, info)
+	elif cdcl:
+		sat = solver.solveCDCL(cnf, pure, unit, splits, restarts)
+	elif iterative:
+		sat = solver.solveIterative(cnf, pure, unit, splits)
+	elif _trail:
+		sat = solver.solveTrail(cnf, pure, unit, splits)
+	else:
+		sat = solver.solve(cnf, pure, unit, splits)
+except solver.Unknown as err:
+	sat, unknown = False, err
 end = time.time()
+solver.setBudget(None)
+
+# List every variable of the original CNF
+if _preprocess and sat:
+	sat.solution = preprocessor.reconstruct(sat)
+elif _symmetry and sat:
+	sat.solution = [ x for x in sat.solution if abs(int(x)) <= variables ]
+
+if _metrics:
+	_metrics.disable()
+
+# The empty clause ends the proof of unsatisfiability
+if proof:
+	if not sat and not unknown:
+		cnf.proof.add([])
+	cnf.proof.close()
 
 # STEP 7 :
 # -----
@@ -131,8 +309,24 @@ if sat :
 	# Print the solution
 	print " Solution : \n-----------"
 	print " satisfiable !"
-	print " positive literals : (%d) " % len(sat.solutions())
-	print " " + ', '.join(sat.solutions())
+	positives = [ x for x in sat.solutions() if int(x) > 0 ]
+	print " positive literals : (%d) " % len(positives)
+	print " " + ', '.join(positives)
+
+	# Check the model against every clause of the original CNF
+	if original == None:
+		clauses = [ logic.Clause(l) for l in literals ] if literals != None else None
+		original = logic.CNF(clauses, [], heuristic, [], []).pack() if clauses != None else cnf.pack()
+	clause = certify.verify(original, sat.solution)
+	if clause == None:
+		print " verified : the model satisfies all %d clauses " % original.size()
+	else:
+		print " ERROR : the model does not satisfy clause %r " % clause
+	print
+
+elif unknown :
+	print " Solution : \n-----------"
+	print " unknown ! (stopped after %s) " % unknown
 	print
 
 else :
@@ -144,13 +338,35 @@ else :
 if info :
 	print " Stats : \n-----------"
 	print " Used heuristic : %r " % heuristic
+
+	# If several configurations were started
+	if portfolio and not unknown:
+		print " Winning configuration : %r " % winner
 	print " Failed splits : %r " % splits[1]
 	print " Successful splits : %r " % (splits[0] - splits[1])
 
+	# If clauses were learned
+	if cdcl and not (portfolio or cubes):
+		print " Number of conflicts : %r " % cnf.conflicts
+		print " Number of learned clauses : %r " % len(cnf.learned)
+		print " Number of restarts : %r " % cnf.restarts
+		print " Learned clauses deleted : %r in %r reductions " % (cnf.deleted, cnf.reductions)
+
+	# If variables were kept in the VSIDS heap
+	if getattr(cnf, "activity", None) != None:
+		print " Heap operations : %r inserts, %r removals, %r updates " % (
+			cnf.activity.inserts, cnf.activity.removals, cnf.activity.updates)
+
 	# If it was satisfiable
 	if sat:
 		print " Number of units propagated : %r " % (len(sat.units))
 		print " Number of pure eliminations : %r " % (len(sat.pures))
+
+	# If the search was stopped (the recursive solver keeps
+	# its assignments in the copies it made)
+	elif unknown and isinstance(cnf, trail.Formula):
+		print " Units propagated when stopped : %r " % (len(cnf.units))
+		print " Pure eliminations when stopped : %r " % (len(cnf.pures))
 	
 	print
 
@@ -160,4 +376,12 @@ if info:
 	print " Solved in %r seconds." % (round(end - start, 4))
 	print
 
+# Display the size and the overhead of the proof
+if proof:
+	cnf.proof.info(end - start)
+
+# Display where the time was spent
+if _metrics:
+	_metrics.report()
+
 
@@ -0,0 +1,165 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Measures where the solver spends its time
+#
+# The methods of CNF and Formula are only replaced by timed
+# wrappers while Metrics are enabled, so the solver runs
+# unchanged otherwise
+#
+
+import time
+import logic
+import trail
+
+
+# Methods which are timed, for every class defining them
+methods = [ "simplify", "unitPropagate", "pureEliminate", "branch", "copy",
+			"emptyClause", "propagate", "analyze", "learn", "reduce" ]
+
+
+# Metrics collects the time spent in every method
+# together with counts of the search
+#
+# @field times : seconds spent in each method
+#                (including the methods it calls)
+# @field calls : number of calls of each method
+# @field propagations : number of literals assigned by unit propagation
+# @field splits : total and failed splits of the solver : every
+#                failed split is a conflict the solver backtracks
+#                from (or analyzes with --cdcl)
+# @field decisions : number of branching splits
+# @field start : time at which the Metrics were enabled
+# @field callback : function called with the Metrics every interval
+#                   seconds during the search or None
+# @field interval : seconds between two calls of the callback
+# @field last : time of the last call of the callback
+# @field originals : methods replaced by wrappers as (class, name, method)
+#
+class Metrics:
+
+	# ========= Fields =========== #
+
+	times = {}
+	calls = {}
+	propagations = 0
+	splits = [0, 0]
+	decisions = 0
+	start = 0
+	callback = None
+	interval = 1.0
+	last = 0
+	originals = []
+
+	# ====== Constructors ======== #
+
+	# Metrics Constructor
+	# Takes the splits of the solver and an optional progress callback
+	def __init__(self, splits, callback = None, interval = 1.0):
+		self.times = {}
+		self.calls = {}
+		self.propagations, self.decisions = 0, 0
+		self.splits = splits
+		self.callback = callback
+		self.interval = interval
+		self.originals = []
+
+	# ======== Methods =========== #
+
+	# Returns a wrapper of a method which times it
+	# and updates the counts of the search
+	def wrap(self, name, method):
+
+		times, calls = self.times, self.calls
+		times[name], calls[name] = 0.0, 0
+
+		def wrapper(cnf, *args):
+
+			units = len(cnf.units)
+			start = time.time()
+			result = method(cnf, *args)
+			end = time.time()
+
+			times[name] += end - start
+			calls[name] += 1
+
+			if name in ("unitPropagate", "learn"):
+				self.propagations += len(cnf.units) - units
+
+			elif name == "branch":
+
+				# The lookahead heuristic may assign literals instead
+				if result != None:
+					self.decisions += 1
+
+				if self.callback != None and end - self.last >= self.interval:
+					self.last = end
+					self.callback(self)
+
+			return result
+
+		wrapper.__name__ = method.__name__
+		wrapper.__doc__ = method.__doc__
+		return wrapper
+
+
+	# Replaces the methods of CNF and Formula by timed wrappers
+	def enable(self):
+
+		self.start = self.last = time.time()
+
+		for cls in [logic.CNF, trail.Formula]:
+			for name in methods:
+
+				# Inherited methods are wrapped in their own class
+				if name not in cls.__dict__ or isinstance(cls.__dict__[name], property):
+					continue
+
+				method = cls.__dict__[name]
+				self.originals.append((cls, name, method))
+				setattr(cls, name, self.wrap(name, method))
+
+
+	# Restores the original methods
+	def disable(self):
+
+		for cls, name, method in reversed(self.originals):
+			setattr(cls, name, method)
+
+		self.originals = []
+
+
+	# Returns the seconds since the Metrics were enabled
+	def elapsed(self):
+		return max(time.time() - self.start, 1e-6)
+
+
+	# Returns a line with the counts of the search per second
+	def progress(self):
+		elapsed = self.elapsed()
+		return " %.1f s : %d decisions (%d/s), %d propagations (%d/s), %d conflicts (%d/s) " % (elapsed,
+			self.decisions, self.decisions / elapsed, self.propagations, self.propagations / elapsed,
+			self.splits[1], self.splits[1] / elapsed)
+
+
+	# Displays the time spent in every method
+	# and the counts of the search
+	def report(self):
+
+		elapsed = self.elapsed()
+
+		print " Profile : \n-----------"
+
+		for name in sorted(self.times, key=self.times.get, reverse=True):
+			if self.calls[name]:
+				print " %-14s %9d calls %10.4f s %6.1f %% " % (name, self.calls[name],
+					self.times[name], 100 * self.times[name] / elapsed)
+
+		print self.progress()
+		print
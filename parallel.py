@@ -0,0 +1,308 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Solves a CNF with several configurations at the
+# same time, one process per configuration
+#
+
+import multiprocessing
+import time
+import branching
+import logic
+import solver
+import trail
+import vectorized
+
+
+# Configurations started by default in portfolio mode
+# A configuration is a heuristic followed by options
+# (unit, pure, trail, iterative, cdcl, index, numpy and the restart
+# schedules luby and geometric which imply cdcl) separated by +
+configurations = [ "jw2+unit+pure", "moms+unit", "dlcs", "vsids+cdcl",
+				   "jw2+cdcl+index", "dlis+unit+iterative+index",
+				   "posit+unit+pure", "firstLiteral+unit" ]
+
+
+# Splits a configuration into its heuristic and options
+#
+# @param configuration : a configuration such as "jw2+unit+pure"
+#
+# @return the heuristic and the set of options
+#
+def parse(configuration):
+
+	tokens = configuration.split('+')
+	options = set(tokens[1:])
+
+	for option in options:
+		if option not in ['unit', 'pure', 'trail', 'iterative', 'cdcl', 'index', 'numpy'] + solver.schedules.keys():
+			raise ValueError("Unknown option %s in configuration %s" % (option, configuration))
+
+	if 'numpy' in options and not vectorized.available():
+		raise ValueError("NumPy is not installed for configuration %s" % configuration)
+
+	if tokens[0] not in branching.heuristics:
+		raise ValueError("Unknown heuristic %s in configuration %s" % (tokens[0], configuration))
+
+	return tokens[0], options
+
+
+# Solves a Packed CNF with a single configuration
+# Runs in a worker process of the portfolio
+#
+# @param task : the Packed CNF, the configuration, k for momsf
+#               and the budget of the search (or None)
+#
+# @return the configuration, the solution, units and pures
+#         (or None if unsatisfiable, or the Unknown error if
+#         the budget was spent), the splits and the time
+#
+def run(task):
+
+	packed, configuration, k, budget = task
+	heuristic, options = parse(configuration)
+	branching.setK(k)
+	solver.setBudget(budget)
+
+	packed.heuristic = heuristic
+	splits = [0, 0]
+	start = time.time()
+
+	# Restart schedule of the cdcl solver
+	restarts = ([ o for o in options if o in solver.schedules ] + [None])[0]
+
+	# Pick the solver exactly like main.py
+	try:
+		if options & set(['trail', 'iterative', 'cdcl']) or restarts:
+
+			cnf = trail.Formula(packed, 'index' in options, 'numpy' in options)
+
+			if 'cdcl' in options or restarts:
+				sat = solver.solveCDCL(cnf, 'pure' in options, 'unit' in options, splits, restarts)
+			elif 'iterative' in options:
+				sat = solver.solveIterative(cnf, 'pure' in options, 'unit' in options, splits)
+			else:
+				sat = solver.solveTrail(cnf, 'pure' in options, 'unit' in options, splits)
+
+		else:
+			sat = solver.solve(packed.unpack(), 'pure' in options, 'unit' in options, splits)
+
+	except solver.Unknown as err:
+		return configuration, err, splits, time.time() - start
+
+	result = (list(sat.solution), list(sat.units), list(sat.pures)) if sat else None
+	return configuration, result, splits, time.time() - start
+
+
+# Solves a CNF with several configurations in a process pool
+# The first configuration to finish wins and the
+# processes still running the others are terminated
+#
+# Every configuration has the budget of solver.budget and
+# Unknown is raised once all of them spent it
+#
+# @param packed : the Packed CNF to solve
+# @param configurations : the configurations to start
+# @param splits : number of total splits and unsuccessful splits
+#                 of the winning configuration
+# @param processes : size of the pool, one per configuration per default :
+#                    with fewer processes the configurations left would
+#                    only start once one of the first ones is finished
+#
+# @return the solved CNF (or False if unsatisfiable)
+#         and the winning configuration
+#
+def portfolio(packed, configurations, splits, processes = None):
+
+	# Fail before starting any process
+	for configuration in configurations:
+		parse(configuration)
+
+	if processes == None:
+		processes = len(configurations)
+
+	pool = multiprocessing.Pool(processes)
+
+	try:
+		tasks = [ (packed, configuration, branching.k, solver.budget) for configuration in configurations ]
+
+		for configuration, result, _splits, elapsed in pool.imap_unordered(run, tasks):
+			if not isinstance(result, solver.Unknown):
+				break
+	finally:
+		pool.terminate()
+		pool.join()
+
+	splits[0], splits[1] = _splits
+
+	if isinstance(result, solver.Unknown):
+		raise result
+
+	if result == None:
+		return False, configuration
+
+	solution, units, pures = result
+	return logic.CNF([], solution, parse(configuration)[0], units, pures), configuration
+
+
+# Splits a CNF into cubes : partial assignments made
+# with CNF.assign by branching with a lookahead-style heuristic
+# until there are n of them (or the search is over)
+#
+# @param cnf : the CNF to split
+# @param n : number of cubes
+# @param pure : whether to use Pure Elimination or not
+# @param unit : whether to use Unit Propagation or not
+# @param splits : number of total splits and unsuccessful splits
+# @param splitter : heuristic used to split
+#
+# @return the cubes as (decisions, CNF) pairs and the solved
+#         CNF if a cube was already satisfied (otherwise None)
+#
+def cube(cnf, n, pure, unit, splits, splitter = "jw2"):
+
+	heuristic = cnf.heuristic
+	cubes = [([], cnf)]
+
+	while cubes and len(cubes) < n:
+
+		decisions, cnf = cubes.pop(0)
+
+		if unit:
+			cnf.unitPropagate()
+		if pure:
+			cnf.pureEliminate()
+
+		# The cube is refuted
+		if cnf.emptyClause():
+			splits[1] += 1
+			continue
+
+		# The cube is satisfied
+		if cnf.isEmpty():
+			cnf.heuristic = heuristic
+			return [], cnf
+
+		cnf.heuristic = splitter
+		l = cnf.branch()
+		splits[0] += 1
+
+		negation = '-' + str(l.variable) if l.polarity else str(l.variable)
+
+		for value, decision in [(True, str(l)), (False, negation)]:
+			child = cnf.copy()
+			child.assign(l, value)
+			cubes.append((decisions + [decision], child))
+
+	for decisions, cnf in cubes:
+		cnf.heuristic = heuristic
+
+	return cubes, None
+
+
+# Solves a cube with the recursive solver
+# Runs in a worker process of cube and conquer
+#
+# @param task : the index of the cube, its CNF, the settings
+#               of solver.solve and the budget (or None)
+#
+# @return the index, the solution, units and pures
+#         (or None if unsatisfiable, or the Unknown error if
+#         the budget was spent), the splits and the time
+#
+def conquer(task):
+
+	index, cnf, pure, unit, k, budget = task
+	branching.setK(k)
+	solver.setBudget(budget)
+
+	splits = [0, 0]
+	start = time.time()
+
+	try:
+		sat = solver.solve(cnf, pure, unit, splits)
+	except solver.Unknown as err:
+		return index, err, splits, time.time() - start
+
+	result = (list(sat.solution), list(sat.units), list(sat.pures)) if sat else None
+	return index, result, splits, time.time() - start
+
+
+# Cube and Conquer : splits a CNF into n cubes and solves
+# every cube in a process pool with solver.solve
+# The first satisfied cube is returned and the processes
+# still running are terminated, the CNF is unsatisfiable
+# once every cube is refuted
+#
+# Every cube has the budget of solver.budget and Unknown is
+# raised when no cube is satisfied but some spent it
+#
+# @param cnf : the CNF to solve
+# @param n : number of cubes
+# @param pure : whether to use Pure Elimination or not
+# @param unit : whether to use Unit Propagation or not
+# @param splits : number of total splits and unsuccessful splits
+#                 over all cubes
+# @param showInfo : whether to show the progress of each cube
+# @param processes : size of the pool (one per core per default)
+#
+# @return the solved CNF or False if unsatisfiable
+#
+def cubeAndConquer(cnf, n, pure, unit, splits, showInfo, processes = None):
+
+	start = time.time()
+	cubes, sat = cube(cnf, n, pure, unit, splits)
+
+	if sat:
+		return sat
+
+	if showInfo:
+		print " Cube and Conquer : \n-----------"
+		print " %d cubes in %r seconds " % (len(cubes), round(time.time() - start, 4))
+
+	if not cubes:
+		return False
+
+	if processes == None:
+		processes = min(len(cubes), multiprocessing.cpu_count())
+
+	pool = multiprocessing.Pool(processes)
+	tasks = [ (i, c, pure, unit, branching.k, solver.budget) for i, (decisions, c) in enumerate(cubes) ]
+	sat, unknown = False, None
+
+	try:
+		for index, result, _splits, elapsed in pool.imap_unordered(conquer, tasks):
+
+			splits[0] += _splits[0]
+			splits[1] += _splits[1]
+
+			if showInfo:
+				print " Cube %d/%d [%s] : %s in %r seconds (%d splits) " % (index + 1, len(cubes),
+					', '.join(cubes[index][0]), "unknown" if isinstance(result, solver.Unknown) else
+					"satisfiable" if result else "refuted", round(elapsed, 4), _splits[0])
+
+			if isinstance(result, solver.Unknown):
+				unknown = result
+
+			elif result:
+				solution, units, pures = result
+				sat = logic.CNF([], solution, cnf.heuristic, units, pures)
+				break
+
+	finally:
+		pool.terminate()
+		pool.join()
+
+	if showInfo:
+		print
+
+	if not sat and unknown != None:
+		raise unknown
+
+	return sat
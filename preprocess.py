@@ -0,0 +1,293 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Simplifies a Packed CNF before it is solved and
+# reconstructs the solution of the original CNF
+#
+
+import time
+import logic
+import trail
+from array import array
+from collections import defaultdict
+
+
+# Clauses of a variable above which it is never eliminated
+occurrences = 16
+
+
+# A Preprocessor simplifies the clauses of a Packed CNF :
+# 1. removes duplicate literals and tautologies
+# 2. removes subsumed clauses and strengthens clauses by
+#    self-subsuming resolution
+# 3. eliminates variables by resolution when it does
+#    not increase the number of clauses
+#
+# Literals are encoded as integers like in a Packed CNF.
+#
+# @field clauses : literals of each clause or None once removed
+# @field occurs : clauses containing each literal
+# @field variables : the variables of the original CNF
+# @field stack : eliminated variables and their clauses, in
+#                elimination order, to reconstruct the solution
+# @field empty : whether an empty clause was derived
+# @field before : number of variables, clauses and literals before
+# @field duplicates : number of duplicate literals removed
+# @field tautologies : number of tautologies removed
+# @field subsumed : number of subsumed clauses removed
+# @field strengthened : number of literals removed by self-subsumption
+# @field time : seconds spent preprocessing
+#
+class Preprocessor:
+
+	# ========= Fields =========== #
+
+	clauses = []
+	occurs = {}
+	variables = set()
+	stack = []
+	empty = False
+	before = (0, 0, 0)
+	duplicates = 0
+	tautologies = 0
+	subsumed = 0
+	strengthened = 0
+	time = 0
+
+	# ====== Constructors ======== #
+
+	# Preprocessor Constructor
+	# Takes the clauses of a Packed CNF
+	def __init__(self, packed):
+
+		self.clauses = [ list(packed.clause(i)) for i in xrange(packed.size()) ]
+		self.occurs = defaultdict(set)
+		self.variables = set( abs(x) for x in packed.literals )
+		self.stack = []
+		self.empty = False
+		self.before = (len(self.variables), len(self.clauses), len(packed.literals))
+		self.duplicates, self.tautologies, self.subsumed, self.strengthened = 0, 0, 0, 0
+		self.time = 0
+
+	# ======== Methods =========== #
+
+	# Removes a clause and its occurrences
+	def remove(self, c):
+
+		for x in self.clauses[c]:
+			self.occurs[x].discard(c)
+
+		self.clauses[c] = None
+
+
+	# Adds a clause and its occurrences
+	# Returns the index of the clause
+	def add(self, clause):
+
+		self.clauses.append(clause)
+		self.empty = self.empty or not clause
+
+		for x in clause:
+			self.occurs[x].add(len(self.clauses) - 1)
+
+		return len(self.clauses) - 1
+
+
+	# STEP 1 : removes duplicate literals and tautologies
+	# and builds the occurrences of every literal
+	def tidy(self):
+
+		for c, clause in enumerate(self.clauses):
+
+			literals = set(clause)
+
+			if any(-x in literals for x in literals):
+				self.tautologies += 1
+				self.clauses[c] = None
+				continue
+
+			# Keep the first occurrence of every literal
+			if len(literals) < len(clause):
+				self.duplicates += len(clause) - len(literals)
+				seen = set()
+				self.clauses[c] = clause = [ x for x in clause if not (x in seen or seen.add(x)) ]
+
+			self.empty = self.empty or not clause
+
+			for x in clause:
+				self.occurs[x].add(c)
+
+
+	# STEP 2 : removes the clauses D subsumed by a clause C
+	# (C is included in D) and removes -x from D when C with
+	# x replaced by -x is included in D (self-subsuming resolution)
+	#
+	# Clauses are visited from the smallest, a strengthened
+	# clause is visited again
+	def subsume(self):
+
+		queue = sorted( (len(clause), c) for c, clause in enumerate(self.clauses) if clause )
+		queue = [ c for size, c in queue ]
+		head = 0
+
+		while head < len(queue) and not self.empty:
+
+			c = queue[head]
+			head += 1
+
+			clause = self.clauses[c]
+			if clause == None:
+				continue
+
+			# Every candidate D contains x or -x for any x of C
+			x = min(clause, key=lambda x : len(self.occurs[x]) + len(self.occurs[-x]))
+
+			for d in list(self.occurs[x] | self.occurs[-x]):
+
+				other = self.clauses[d]
+				if d == c or other == None or len(other) < len(clause):
+					continue
+
+				literals = set(other)
+				missing = [ y for y in clause if y not in literals ]
+
+				if not missing:
+					self.subsumed += 1
+					self.remove(d)
+
+				elif len(missing) == 1 and -missing[0] in literals:
+					self.strengthened += 1
+					self.occurs[-missing[0]].discard(d)
+					other.remove(-missing[0])
+					self.empty = self.empty or not other
+					queue.append(d)
+
+
+	# STEP 3 : eliminates the variables whose clauses can be
+	# replaced by at most as many resolvents, starting with the
+	# variables with the fewest possible resolvents
+	def eliminate(self):
+
+		order = sorted(self.variables, key=lambda v : len(self.occurs[v]) * len(self.occurs[-v]))
+
+		for v in order:
+
+			positive, negative = list(self.occurs[v]), list(self.occurs[-v])
+
+			if self.empty:
+				return
+			if not positive and not negative:
+				continue
+			if len(positive) + len(negative) > occurrences:
+				continue
+
+			# Resolve every clause with v with every clause with -v
+			resolvents = []
+
+			for p in positive:
+				for n in negative:
+
+					literals = set(self.clauses[p]) | set(self.clauses[n])
+					literals.discard(v)
+					literals.discard(-v)
+
+					if not any(-y in literals for y in literals):
+						resolvents.append(sorted(literals, key=abs))
+
+				if len(resolvents) > len(positive) + len(negative):
+					break
+
+			if len(resolvents) > len(positive) + len(negative):
+				continue
+
+			# Keep the clauses to reconstruct the value of v
+			self.stack.append((v, [ self.clauses[c] for c in positive + negative ]))
+
+			for c in positive + negative:
+				self.remove(c)
+
+			for resolvent in resolvents:
+				self.add(resolvent)
+
+
+	# Runs all steps
+	# @return the simplified Packed CNF
+	def run(self, heuristic):
+
+		start = time.time()
+
+		self.tidy()
+		self.subsume()
+		self.eliminate()
+		self.subsume()
+
+		self.time = time.time() - start
+		return self.packed(heuristic)
+
+
+	# Returns the remaining clauses as a Packed CNF
+	# (a single empty clause once one was derived)
+	def packed(self, heuristic):
+
+		literals = array('i')
+		offsets = array('i', [0])
+
+		for clause in ([[]] if self.empty else self.clauses):
+			if clause != None:
+				literals.extend(clause)
+				offsets.append(len(literals))
+
+		return logic.Packed(literals, offsets, max(self.variables or [0]), heuristic)
+
+
+	# Completes the solution of the simplified CNF into a
+	# solution of the original CNF, listing every variable
+	#
+	# @param sat : the solved CNF or Formula
+	#
+	# @return the literals assigned to True
+	def reconstruct(self, sat):
+
+		model = {}
+
+		if isinstance(sat, trail.Formula):
+			for v in xrange(1, len(sat.values)):
+				if sat.values[v] != 0:
+					model[v] = sat.values[v] == 1
+
+		else:
+			for x in sat.solution:
+				model[abs(int(x))] = int(x) > 0
+
+		# Variables without clause take False
+		for v in self.variables:
+			model.setdefault(v, False)
+
+		# Eliminated variables, the last one first : v is True
+		# if a clause with v is not satisfied by its other literals
+		for v, clauses in reversed(self.stack):
+			model[v] = any( x == v for clause in clauses for x in clause if not any(
+				model[abs(y)] == (y > 0) for y in clause if abs(y) != v ) )
+
+		return [ str(v) if model[v] else str(-v) for v in sorted(self.variables) ]
+
+
+	# Displays the reduction
+	def info(self, packed):
+
+		after = (len(set( abs(x) for x in packed.literals )), packed.size(), len(packed.literals))
+
+		print " Preprocessing : \n-----------"
+		print " %r -> %r variables, %r -> %r clauses, %r -> %r literals " % (
+			self.before[0], after[0], self.before[1], after[1], self.before[2], after[2])
+		print " %r duplicate literals, %r tautologies, %r subsumed clauses, %r strengthened literals, %r eliminated variables " % (
+			self.duplicates, self.tautologies, self.subsumed, self.strengthened, len(self.stack))
+		print " Preprocessed in %r seconds " % round(self.time, 4)
+		print
+
@@ -7,14 +7,108 @@
 # Daniel Balle 2014
 
 #
-# Solver.py implements a single function
+# Solver.py implements the functions
 # responsible for the DPLL algorithm
 #
 
 import logic
+import trail
+import branching
+import time
+
+try:
+	import resource
+except ImportError:
+	# The memory budget is only checked on Unix
+	resource = None
+
+
+# Raised by the solvers once the budget of the search is spent :
+# the CNF is neither known to be satisfiable nor unsatisfiable
+# The splits hold the statistics of the search so far
+class Unknown(Exception):
+	pass
+
+
+# Budget limits the search of the solvers
+# It is checked at every split, the memory only every
+# interval splits as it takes a system call
+#
+# @field seconds : maximum wall-clock time or None
+# @field splits : maximum number of splits or None
+# @field conflicts : maximum number of failed splits or None
+# @field memory : maximum peak memory of the process in bytes or None
+# @field start : time at which the search started
+# @field checks : number of checks so far
+# @field interval : number of checks between two memory checks
+#
+class Budget:
+
+	# ========= Fields =========== #
+
+	seconds = None
+	splits = None
+	conflicts = None
+	memory = None
+	start = 0
+	checks = 0
+	interval = 64
+
+	# ====== Constructors ======== #
+
+	# Budget Constructor
+	# Every limit is optional
+	def __init__(self, seconds = None, splits = None, conflicts = None, memory = None):
+		self.seconds = seconds
+		self.splits = splits
+		self.conflicts = conflicts
+		self.memory = memory
+		self.start = time.time()
+		self.checks = 0
+
+	# ======== Methods =========== #
+
+	# Raises Unknown if a limit was reached
+	#
+	# @param splits : number of total splits and unsuccessful splits
+	def check(self, splits):
+
+		self.checks += 1
+
+		if self.splits != None and splits[0] >= self.splits:
+			raise Unknown("%d splits" % self.splits)
+
+		if self.conflicts != None and splits[1] >= self.conflicts:
+			raise Unknown("%d conflicts" % self.conflicts)
+
+		if self.seconds != None and time.time() - self.start >= self.seconds:
+			raise Unknown("%r seconds" % self.seconds)
+
+		# ru_maxrss is in KB on Linux
+		if self.memory != None and resource and self.checks % self.interval == 0:
+			if resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 > self.memory:
+				raise Unknown("%r MB of memory" % (self.memory / 1024.0 / 1024))
+
+
+# Global budget of the solvers (None for no limit)
+budget = None
+
+# Sets the budget of the following searches
+# Its time starts now
+def setBudget(b):
+	global budget
+	budget = b
+
+	if budget != None:
+		budget.start = time.time()
+		budget.checks = 0
+
 
 # Solves the given CNF using the DPLL algorithm
 #
+# Every solver raises Unknown at a split once the budget
+# (see setBudget) is spent
+#
 # @param cnf : the CNF to be solved
 # @param pure : whether to use Pure Elimination or not
 # @param unit : whether to use Unit Propagation or not
@@ -63,7 +157,16 @@ def solve(cnf, pure, unit, splits):
 	# STEP 3 : Branching Step
 	# -----
 	# Select unassigned literal in CNF
+	if budget != None:
+		budget.check(splits)
+
+	branching.setUnit(unit)
 	l = cnf.branch()
+
+	# The heuristic assigned literals itself (lookahead)
+	if l == None:
+		return solve(cnf, pure, unit, splits)
+
 	splits[0] += 1
 
 
@@ -83,5 +186,272 @@ def solve(cnf, pure, unit, splits):
 	return solve(cnft, pure, unit, splits) or solve(cnf, pure, unit, splits)
 
 
+# Solves the given CNF using the DPLL algorithm
+# on a single mutable formula : assignments are saved
+# on a trail and undone on backtrack instead of
+# copying the CNF at every split
+#
+# @param cnf : the CNF to be solved
+# @param pure : whether to use Pure Elimination or not
+# @param unit : whether to use Unit Propagation or not
+# @param splits : number of total splits and unsuccessful splits
+#
+# @return whether cnf is satisfiable or not
+#
+def solveTrail(cnf, pure, unit, splits):
+
+	# The formula is created once for the whole search
+	if not isinstance(cnf, trail.Formula):
+		cnf = trail.Formula(cnf)
+
+	# STEP 1a : Unit Propagation
+	if unit:
+		cnf.unitPropagate()
+
+	# STEP 1b : Pure Literal Elimination
+	if pure:
+		cnf.pureEliminate()
+
+	# STEP 2a : the formula contains an empty clause
+	if cnf.emptyClause():
+		splits[1] += 1
+		return False
+
+	# STEP 2b : the formula contains no more clauses
+	if cnf.isEmpty():
+		return cnf
+
+	# STEP 3 : Branching Step
+	if budget != None:
+		budget.check(splits)
+
+	branching.setUnit(unit)
+	l = cnf.branch()
+
+	# The heuristic assigned literals itself (lookahead)
+	if l == None:
+		return solveTrail(cnf, pure, unit, splits)
+
+	splits[0] += 1
+
+	# STEP 4 :
+	# -----
+	# Assign the literal on a new decision level
+	# and undo the assignment if it fails
+	level = cnf.level()
+
+	cnf.decide()
+	cnf.assign(l, True)
+
+	if solveTrail(cnf, pure, unit, splits):
+		return cnf
+
+	cnf.backtrack(level)
+
+	# STEP 5 :
+	# -----
+	# Try the opposite value on the current level
+	cnf.assign(l, False)
+	return solveTrail(cnf, pure, unit, splits)
+
+
+# Solves the given CNF using the DPLL algorithm
+# without recursion : the splits whose opposite value
+# was not tried yet are kept on an explicit stack
+#
+# @param cnf : the CNF to be solved
+# @param pure : whether to use Pure Elimination or not
+# @param unit : whether to use Unit Propagation or not
+# @param splits : number of total splits and unsuccessful splits
+#
+# @return whether cnf is satisfiable or not
+#
+def solveIterative(cnf, pure, unit, splits):
+
+	# The formula is created once for the whole search
+	if not isinstance(cnf, trail.Formula):
+		cnf = trail.Formula(cnf)
+
+	# Decision stack : the level and literal of each
+	# split which still has to be tried with False
+	stack = []
+
+	while True:
+
+		# STEP 1a : Unit Propagation
+		if unit:
+			cnf.unitPropagate()
+
+		# STEP 1b : Pure Literal Elimination
+		if pure:
+			cnf.pureEliminate()
+
+		# STEP 2a : the formula contains an empty clause
+		if cnf.emptyClause():
+			splits[1] += 1
+
+			# Every split was tried with both values
+			if not stack:
+				return False
+
+			# Undo the last split and try the opposite value
+			level, l = stack.pop()
+			cnf.backtrack(level)
+			cnf.assign(l, False)
+			continue
+
+		# STEP 2b : the formula contains no more clauses
+		if cnf.isEmpty():
+			return cnf
+
+		# STEP 3 : Branching Step
+		if budget != None:
+			budget.check(splits)
+
+		branching.setUnit(unit)
+		l = cnf.branch()
+
+		# The heuristic assigned literals itself (lookahead)
+		if l == None:
+			continue
+
+		splits[0] += 1
+
+		# STEP 4 : Assign the literal on a new decision level
+		stack.append((cnf.level(), l))
+		cnf.decide()
+		cnf.assign(l, True)
+
+
+# Returns the i-th element of the Luby sequence
+# 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+def luby(i):
+
+	# Find the finished subsequence of size 2^k - 1 containing i
+	k = 1
+	while (1 << k) - 1 < i:
+		k += 1
+
+	while (1 << k) - 1 != i:
+		i -= (1 << (k - 1)) - 1
+		k = 1
+		while (1 << k) - 1 < i:
+			k += 1
+
+	return 1 << (k - 1)
+
+
+# Restart schedules : number of conflicts allowed
+# before the i-th restart (i starts at 1)
+schedules = { "luby" : lambda i : 100 * luby(i),
+			  "geometric" : lambda i : int(100 * 1.5 ** (i - 1)) }
+
+
+# Solves the given CNF using Conflict Driven Clause Learning
+# Every empty clause is analyzed to learn a new clause and
+# the solver backjumps to the level where that clause becomes
+# unit instead of trying the opposite value of the last split
+#
+# Unit Propagation is always used and Pure Elimination
+# is not, as pure literals are not implied by any clause
+#
+# Learned clauses are periodically reduced (see Formula.reduce).
+# With restarts the solver backtracks to level 0 whenever the
+# number of conflicts since the last restart reaches the schedule.
+# Learned clauses are kept and every split is assigned the value
+# its variable had before the restart (phase saving).
+#
+# Assumptions are assigned first, each one on its own decision
+# level, so that learned clauses remain implied by the formula
+# alone and a Formula can be solved again (see Formula.addClause)
+#
+# @param cnf : the CNF to be solved
+# @param pure : ignored, see above
+# @param unit : ignored, see above
+# @param splits : number of total splits and unsuccessful splits
+# @param restarts : name of the restart schedule or None
+# @param assumptions : encoded literals assumed to be True
+#
+# @return whether cnf is satisfiable or not
+#         (under the assumptions)
+#
+def solveCDCL(cnf, pure, unit, splits, restarts = None, assumptions = []):
+
+	# The formula is created once for the whole search
+	if not isinstance(cnf, trail.Formula):
+		cnf = trail.Formula(cnf)
+
+	# Undo the search of a previous call
+	cnf.backtrack(0)
+
+	# Conflicts left before the next restart
+	conflicts = schedules[restarts](1) if restarts else -1
+
+	while True:
+
+		# STEP 1 : Unit Propagation
+		cnf.unitPropagate()
+
+		# STEP 2a : the formula contains an empty clause
+		if cnf.emptyClause():
+			splits[1] += 1
+
+			# Conflict without any split
+			if cnf.level() == 0:
+				return False
+
+			# Learn a clause and backjump
+			clause, level = cnf.analyze()
+			conflict = cnf.level()
+			cnf.backtrack(level)
+			cnf.learn(clause, conflict)
+			conflicts -= 1
+			continue
+
+		# STEP 2b : assign the next assumption on its own level
+		# (an empty level if it is already True)
+		if cnf.level() < len(assumptions):
+			x = assumptions[cnf.level()]
+
+			if cnf.value(x) == False:
+				return False
+
+			cnf.decide()
+			if cnf.value(x) == None:
+				cnf.assign(cnf.literal(x), True)
+			continue
+
+		# STEP 2c : the formula contains no more clauses
+		if cnf.isEmpty():
+			return cnf
+
+		# STEP 2d : delete learned clauses when there are too many
+		if cnf.reduceDue():
+			cnf.reduce()
+
+		# STEP 2e : restart once the conflicts are spent
+		if restarts and conflicts <= 0:
+			cnf.restarts += 1
+			conflicts = schedules[restarts](cnf.restarts + 1)
+			cnf.backtrack(0)
+			continue
+
+		# STEP 3 : Branching Step
+		if budget != None:
+			budget.check(splits)
+
+		branching.setUnit(True)
+		l = cnf.branch()
+
+		# The heuristic assigned literals itself (lookahead)
+		if l == None:
+			continue
+
+		splits[0] += 1
+
+		if restarts:
+			l = cnf.phase(l)
 
-	
\ No newline at end of file
+		# STEP 4 : Assign the literal on a new decision level
+		cnf.decide()
+		cnf.assign(l, True)
@@ -0,0 +1,336 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Finds symmetries of a Packed CNF : permutations of
+# its literals mapping its clauses onto its clauses, and
+# adds lex-leader clauses so that the solver does not
+# explore symmetric parts of the search again
+#
+
+import time
+from array import array
+from collections import defaultdict
+import logic
+
+
+# Refinements after which the search for symmetries stops
+nodes = 20000
+
+# Largest graph (literals and clauses) searched for symmetries
+vertices = 50000
+
+# Largest number of variables of a lex-leader constraint
+length = 100
+
+
+# Splits the cells of a partition of the vertices of a graph
+# until every vertex of a cell has as many neighbours in
+# each cell as the others (an equitable partition)
+#
+# A cell is split in the order of the cells of the neighbours,
+# so two partitions split the same way for isomorphic graphs
+#
+# @param cells : the partition as a list of lists of vertices
+# @param adjacency : neighbours of each vertex
+#
+# @return the refined partition
+#
+def refine(cells, adjacency):
+
+	while True:
+
+		cell = {}
+		for i, c in enumerate(cells):
+			for v in c:
+				cell[v] = i
+
+		refined = []
+
+		for c in cells:
+
+			if len(c) == 1:
+				refined.append(c)
+				continue
+
+			groups = defaultdict(list)
+			for v in c:
+				groups[tuple(sorted( cell[u] for u in adjacency[v] ))].append(v)
+
+			for key in sorted(groups):
+				refined.append(groups[key])
+
+		if len(refined) == len(cells):
+			return refined
+
+		cells = refined
+
+
+# Returns the partition where vertex v of cell t
+# is put in a cell of its own, before the others
+def individualize(cells, t, v):
+	return cells[:t] + [[v], [ u for u in cells[t] if u != v ]] + cells[t + 1:]
+
+
+# Symmetries finds generators of the group of symmetries of
+# a Packed CNF with a search of individualization and refinement
+# over a graph with a vertex per literal and per clause :
+# a literal is linked to its negation and to its clauses
+#
+# Literal x is vertex 2(|x| - 1) for x > 0 and 2(|x| - 1) + 1
+# otherwise, clause i is vertex 2n + i
+#
+# @field variables : the highest variable
+# @field clauses : the clauses as sets of literals, without duplicates
+# @field adjacency : neighbours of each vertex
+# @field generators : symmetries found, as the literal of
+#                     the image of each variable
+# @field budget : refinements left for the search
+# @field time : seconds spent looking for symmetries
+#
+class Symmetries:
+
+	# ========= Fields =========== #
+
+	variables = 0
+	clauses = set()
+	adjacency = []
+	generators = []
+	budget = 0
+	time = 0
+
+	# ====== Constructors ======== #
+
+	# Symmetries Constructor
+	# Builds the graph of a Packed CNF
+	def __init__(self, packed):
+
+		self.variables = packed.variables
+		self.clauses = set( frozenset(packed.clause(i)) for i in xrange(packed.size()) )
+		self.generators = []
+		self.budget = nodes
+		self.time = 0
+
+		n = self.variables
+		self.adjacency = [ [] for v in xrange(2 * n + len(self.clauses)) ]
+
+		for v in xrange(n):
+			self.adjacency[2 * v].append(2 * v + 1)
+			self.adjacency[2 * v + 1].append(2 * v)
+
+		for i, clause in enumerate(self.clauses):
+			for x in clause:
+				self.adjacency[self.vertex(x)].append(2 * n + i)
+				self.adjacency[2 * n + i].append(self.vertex(x))
+
+	# ======== Methods =========== #
+
+	# Returns the vertex of a literal
+	def vertex(self, x):
+		return 2 * (abs(x) - 1) + (x < 0)
+
+
+	# Returns the literal of a vertex
+	def literal(self, u):
+		return -(u / 2 + 1) if u % 2 else u / 2 + 1
+
+
+	# Returns the symmetry of the CNF given by a mapping of the
+	# vertices or None if it does not map clauses onto clauses
+	def symmetry(self, mapping):
+
+		image = {}
+		for v in xrange(1, self.variables + 1):
+			image[v] = self.literal(mapping[self.vertex(v)])
+
+			if mapping[self.vertex(-v)] != self.vertex(-image[v]):
+				return None
+
+		sign = lambda x : image[x] if x > 0 else -image[-x]
+
+		for clause in self.clauses:
+			if frozenset( sign(x) for x in clause ) not in self.clauses:
+				return None
+
+		return image
+
+
+	# Individualizes vertex w in cell t of a partition equivalent
+	# to the partition at the given level of the first path and
+	# looks for a leaf below it, following the choices of the path
+	#
+	# @return the symmetry mapping the first leaf to that leaf or None
+	def search(self, cells, t, w, path, level, leaf):
+
+		self.budget -= 1
+		if self.budget < 0:
+			return None
+
+		cells = refine(individualize(cells, t, w), self.adjacency)
+		following = path[level + 1][0] if level + 1 < len(path) else leaf
+
+		# The cells must have the sizes of the cells of the path
+		if [ len(c) for c in cells ] != [ len(c) for c in following ]:
+			return None
+
+		if level + 1 == len(path):
+			return self.symmetry(dict( (leaf[i][0], cells[i][0]) for i in xrange(len(leaf)) ))
+
+		t = path[level + 1][1]
+
+		for u in cells[t]:
+			image = self.search(cells, t, u, path, level + 1, leaf)
+			if image != None:
+				return image
+
+		return None
+
+
+	# Finds generators of the group of symmetries
+	#
+	# The first path individualizes the first vertex of the first
+	# cell of more than one vertex until every cell is a single
+	# vertex. Each level is then visited from the deepest : another
+	# vertex of the cell of that level which is not known to be in
+	# the same orbit is individualized instead and a leaf matching
+	# the first leaf is searched below it.
+	def find(self):
+
+		start = time.time()
+		n = self.variables
+
+		if 2 * n + len(self.clauses) > vertices:
+			return self.generators
+
+		# Literals and clauses of each size are told apart from the start
+		# Literals without clause are left alone in a cell of their own
+		colors = defaultdict(list)
+		for u in xrange(len(self.adjacency)):
+			if u < 2 * n and len(self.adjacency[u]) == 1:
+				colors[(-1, u)].append(u)
+			else:
+				colors[(0, 0) if u < 2 * n else (1, len(self.adjacency[u]))].append(u)
+
+		cells = refine([ colors[key] for key in sorted(colors) ], self.adjacency)
+		path = []
+
+		while any(len(c) > 1 for c in cells):
+			t = min( i for i, c in enumerate(cells) if len(c) > 1 )
+			v = min(cells[t])
+			path.append((cells, t, v))
+			cells = refine(individualize(cells, t, v), self.adjacency)
+
+		leaf = cells
+
+		# Orbits of the vertices under the generators found so far
+		orbits = range(len(self.adjacency))
+
+		def orbit(u):
+			while orbits[u] != u:
+				orbits[u] = orbits[orbits[u]]
+				u = orbits[u]
+			return u
+
+		for level in reversed(xrange(len(path))):
+
+			cells, t, v = path[level]
+
+			for w in cells[t]:
+
+				if self.budget < 0:
+					break
+				if orbit(w) == orbit(v):
+					continue
+
+				image = self.search(cells, t, w, path, level, leaf)
+
+				if image == None:
+					continue
+
+				self.generators.append(image)
+
+				for x in xrange(1, n + 1):
+					for y in [x, -x]:
+						z = image[x] if y > 0 else -image[x]
+						orbits[orbit(self.vertex(y))] = orbit(self.vertex(z))
+
+		self.time = time.time() - start
+		return self.generators
+
+
+	# Returns the lex-leader clauses of the generators : every
+	# assignment must be at most its image by each generator
+	# when the variables are compared in increasing order
+	#
+	# For the i-th variable x moved by a generator to literal y,
+	# a new variable e(i) is True when the variables before x
+	# have the values of their images :
+	#     e(i-1) and x -> y
+	#     e(i-1) and x -> e(i)        e(i-1) and -y -> e(i)
+	#
+	# @return the clauses and the highest variable they use
+	def leaders(self):
+
+		added = []
+		top = self.variables
+
+		for image in self.generators:
+
+			moved = [ x for x in xrange(1, self.variables + 1) if image[x] != x ][:length]
+			previous = None
+
+			for k, x in enumerate(moved):
+
+				y = image[x]
+				guard = [] if previous == None else [-previous]
+
+				added.append(guard + [-x, y] if y != -x else guard + [-x])
+
+				# x and its image always differ after a variable
+				# mapped to its negation
+				if y == -x or k == len(moved) - 1:
+					break
+
+				top += 1
+				added.append(guard + [-x, top])
+				added.append(guard + [y, top])
+				previous = top
+
+		return added, top
+
+
+
+# Adds the lex-leader clauses of the symmetries of a Packed CNF
+#
+# @param packed : the Packed CNF
+# @param showInfo : whether to display the symmetries found
+#
+# @return the Packed CNF with the new clauses
+#
+def breakSymmetries(packed, showInfo):
+
+	symmetries = Symmetries(packed)
+	generators = symmetries.find()
+	added, top = symmetries.leaders()
+
+	literals = array('i', packed.literals)
+	offsets = array('i', packed.offsets)
+
+	for clause in added:
+		literals.extend(clause)
+		offsets.append(len(literals))
+
+	if showInfo:
+		print " Symmetries : \n-----------"
+		print " %r generators, %r lex-leader clauses over %r new variables " % (len(generators),
+			len(added), top - packed.variables)
+		print " Found in %r seconds%s " % (round(symmetries.time, 4),
+			" (search stopped)" if symmetries.budget < 0 else "")
+		print
+
+	return logic.Packed(literals, offsets, top, packed.heuristic)
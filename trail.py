@@ -0,0 +1,1131 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Implements a mutable CNF for the SAT solver :
+# assignments are saved on a trail and undone on
+# backtrack instead of copying the CNF at every split
+#
+
+import logic
+import heapq
+import itertools
+import operator
+import vectorized
+from array import array
+from collections import deque
+
+
+# A Formula is a CNF which is never copied
+#
+# Literals are encoded as integers (x or -x) and clauses
+# are stored in flat arrays like in a Packed CNF. Clauses
+# are never simplified : instead the value of every variable
+# is kept and the solver backtracks by undoing assignments.
+# The solvers never copy it : the copy inherited from CNF is a
+# CNF of Clause objects with the clauses of the view (see clauses).
+#
+# @field literals : array of the literals of all clauses
+# @field offsets : array of the start of each clause
+# @field table : the Literal object of each integer
+# @field values : assignment of each variable
+#                 (0 if unassigned, 1 if True, 2 if False)
+# @field levels : decision level at which each variable was assigned
+# @field reasons : clause which implied each variable or -1
+# @field trail : literals assigned to True, in assignment order
+# @field marks : saved sizes of the trail, solution, units and pures
+#                at the beginning of each decision level
+# @field watches : clauses watching each literal
+# @field watched : positions of the two watched literals of each clause
+# @field pending : literals implied by clauses which became unit
+#                  together with these clauses
+# @field conflict : a clause with only False literals or None
+# @field version : incremented whenever the assignment changes
+# @field size : number of clauses of the original CNF, stored first
+# @field learned : clauses added by conflict analysis, stored
+#                 after the clauses of the original CNF
+# @field added : clauses added to the original CNF by addClause,
+#                stored after the learned clauses of that time
+# @field lbds : literal block distance of each clause stored after
+#              the original CNF (number of decision levels of its
+#              literals when learned, 0 for an added clause)
+# @field activities : activity of each clause stored after the original
+#                     CNF, bumped whenever it takes part in a conflict
+#                     analysis (only used for the learned clauses)
+# @field increment : current size of a bump of a learned clause
+# @field limit : number of learned clauses triggering the next reduction
+# @field cap : maximum number of learned clauses or None
+# @field memory : maximum bytes of learned clauses or None
+# @field kept : number of learned clauses kept by the last reduction
+# @field reductions : number of reductions of the learned clauses
+# @field deleted : number of learned clauses deleted
+# @field conflicts : number of conflicts analyzed
+# @field restarts : number of restarts
+# @field phases : last value of each variable before it was
+#                 unassigned (0 if never assigned)
+# @field index : occurrences of the literals for the heuristics or None
+# @field scores : NumPy arrays of the clauses for the heuristics or None
+# @field activity : activity of the variables for VSIDS or None
+# @field proof : DRAT proof of the learned and deleted clauses or None
+# @field occurrences : positions in originals of the clauses of the
+#                      original CNF containing each literal, kept
+#                      without Index
+# @field trues : number of TRUE literals of each clause of the original
+#                CNF, by position in originals
+# @field satisfied : number of clauses of the original CNF with a TRUE literal
+#
+class Formula(logic.CNF):
+
+	# ========= Fields =========== #
+
+	literals = array('i')
+	offsets = array('i', [0])
+	table = {}
+	values = bytearray()
+	levels = array('i')
+	reasons = array('i')
+	trail = []
+	marks = []
+	watches = {}
+	watched = array('i')
+	pending = deque()
+	conflict = None
+	head = 0
+	version = 0
+	cache = (-1, [])
+	size = 0
+	learned = []
+	added = []
+	lbds = array('i')
+	activities = []
+	increment = 1.0
+	limit = 2000
+	cap = None
+	memory = None
+	kept = 0
+	reductions = 0
+	deleted = 0
+	conflicts = 0
+	restarts = 0
+	phases = bytearray()
+	index = None
+	scores = None
+	activity = None
+	proof = None
+	occurrences = {}
+	trues = array('i')
+	satisfied = 0
+
+	# ====== Constructors ======== #
+
+	# Formula Constructor
+	# Takes the clauses and settings of an existing CNF
+	# or Packed CNF
+	#
+	# @param indexed : whether to keep an Index of the occurrences
+	#                  of the literals for the branching heuristics
+	# @param vectorize : whether to compute the scores of the
+	#                    branching heuristics with NumPy
+	def __init__(self, cnf, indexed = False, vectorize = False):
+
+		self.heuristic = cnf.heuristic
+		self.table = {}
+
+		if isinstance(cnf, logic.Packed):
+
+			# Literal objects are only created for the heuristics
+			self.literals = array('i', cnf.literals)
+			self.offsets = array('i', cnf.offsets)
+			self.solution, self.units, self.pures = [], [], []
+			variables = cnf.variables
+
+		else:
+
+			# Encode every literal as an integer
+			# and keep the Literal objects of the CNF
+			self.literals = array('i')
+			self.offsets = array('i', [0])
+
+			for clause in cnf.clauses:
+				for l in clause.literals:
+					self.table[self.code(l)] = l
+					self.literals.append(self.code(l))
+				self.offsets.append(len(self.literals))
+
+			self.solution = list(cnf.solution)
+			self.units = list(cnf.units)
+			self.pures = list(cnf.pures)
+			variables = max([ abs(x) for x in self.table ] or [0])
+
+		self.values = bytearray(variables + 1)
+		self.levels = array('i', [0]) * (variables + 1)
+		self.reasons = array('i', [-1]) * (variables + 1)
+
+		self.trail = []
+		self.marks = []
+		self.watches = {}
+		self.watched = array('i')
+		self.pending = deque()
+		self.conflict = None
+		self.head = 0
+		self.version = 0
+		self.cache = (-1, [])
+		self.size = len(self.offsets) - 1
+		self.learned = []
+		self.added = []
+		self.lbds = array('i')
+		self.activities = []
+		self.increment = 1.0
+		self.limit = 2000
+		self.cap = None
+		self.memory = None
+		self.kept = 0
+		self.reductions = 0
+		self.deleted = 0
+		self.conflicts = 0
+		self.restarts = 0
+		self.phases = bytearray(variables + 1)
+
+		# Watch the first two literals of each clause
+		for index in xrange(self.size):
+			self.watch(index)
+
+		self.index = Index(self) if indexed else None
+		self.scores = vectorized.Scores(self) if vectorize else None
+		self.activity = None
+		self.proof = None
+
+		# Without Index the satisfied clauses are counted
+		# on every assignment so that isEmpty is O(1)
+		self.occurrences = {}
+		self.trues = array('i', [0]) * self.size
+		self.satisfied = 0
+
+		if self.index == None:
+			for index in xrange(self.size):
+				for x in self.clause(index):
+					self.occurrences.setdefault(x, []).append(index)
+
+
+	# ======== Properties ========= #
+
+	# The clauses as the simplified CNF would contain them :
+	# clauses without TRUE literal, without their FALSE literals
+	# required by the branching heuristics
+	# Learned clauses are not part of the view
+	#
+	# The view is cached until the next assignment or backtrack
+	@property
+	def clauses(self):
+
+		if self.cache[0] == self.version:
+			return self.cache[1]
+
+		clauses = []
+		values = self.values
+
+		for index in self.originals():
+
+			literals = []
+
+			for x in self.clause(index):
+				v = values[abs(x)]
+				if v == 0:
+					literals.append(self.literal(x))
+				elif (v == 1) == (x > 0):
+					break
+
+			else:
+				clauses.append(logic.Clause(literals))
+
+		self.cache = (self.version, clauses)
+		return clauses
+
+	# ======== Methods =========== #
+
+	# Returns the integer encoding of a Literal
+	def code(self, literal):
+		identifier = literal.variable.identifier
+		return identifier if literal.polarity else -identifier
+
+
+	# Returns the Literal object of an integer
+	# Creates it the first time when the Formula
+	# was built from a Packed CNF
+	def literal(self, x):
+
+		if x not in self.table:
+
+			if -x in self.table:
+				variable = self.table[-x].variable
+			else:
+				variable = logic.Var(abs(x))
+
+			self.table[x] = logic.Literal(variable, x > 0)
+
+		return self.table[x]
+
+
+	# Returns the literals of a clause
+	def clause(self, index):
+		return self.literals[self.offsets[index]:self.offsets[index + 1]]
+
+
+	# Returns the indices of the clauses of the original CNF :
+	# the clauses it was built with, then the added clauses
+	def originals(self):
+		return itertools.chain(xrange(self.size), self.added)
+
+
+	# Returns the first literal of the view without building it :
+	# the first unassigned literal of the first clause of the
+	# original CNF without TRUE literal
+	#
+	# Without Index the clauses without TRUE literal are found
+	# from the counts of TRUE literals kept on every assignment
+	def first(self):
+
+		if self.index != None:
+			return self.index.first()
+
+		values = self.values
+		unsatisfied = itertools.compress(itertools.count(), itertools.imap(operator.not_, self.trues))
+
+		for k in unsatisfied:
+			index = k if k < self.size else self.added[k - self.size]
+			for x in self.clause(index):
+				if values[abs(x)] == 0:
+					return self.literal(x)
+
+
+	# Creates the Packed CNF of the clauses of the Formula
+	# (learned clauses are implied by them and left out)
+	def pack(self):
+
+		literals = self.literals[:self.offsets[self.size]]
+		offsets = self.offsets[:self.size + 1]
+
+		for index in self.added:
+			literals.extend(self.clause(index))
+			offsets.append(len(literals))
+
+		return logic.Packed(literals, offsets, len(self.values) - 1, self.heuristic)
+
+
+	# Returns the value of an encoded literal
+	# (True, False or None if unassigned)
+	def value(self, x):
+		v = self.values[abs(x)]
+		return None if v == 0 else (v == 1) == (x > 0)
+
+
+	# Returns the literal of the same variable in the value
+	# it had before it was last unassigned (phase saving)
+	def phase(self, literal):
+
+		x = self.code(literal)
+
+		if self.phases[abs(x)] == 0:
+			return literal
+
+		return self.literal(abs(x) if self.phases[abs(x)] == 1 else -abs(x))
+
+
+	# Returns the current decision level
+	def level(self):
+		return len(self.marks)
+
+
+	# Returns whether the Formula has no more clauses
+	# i.e. every clause contains a TRUE literal
+	# (learned clauses are implied by the others)
+	def isEmpty(self):
+
+		if self.index != None:
+			return self.index.remaining == 0
+
+		return self.satisfied == self.size + len(self.added)
+
+
+	# Returns whether the Formula contains an empty clause
+	def emptyClause(self):
+		return self.conflict != None
+
+
+	# Watches the first two literals of a clause
+	# (a clause of size one watches its literal twice)
+	def watch(self, index):
+
+		start, end = self.offsets[index], self.offsets[index + 1]
+
+		self.watched.append(start)
+		self.watched.append(min(start + 1, end - 1))
+
+		if start == end:
+			self.conflict = index
+			return
+
+		if end - start == 1:
+			self.pending.append((self.literals[start], index))
+
+		for position in set(self.watched[-2:]):
+			self.watches.setdefault(self.literals[position], []).append(index)
+
+
+	# Opens a new decision level
+	# which can be undone using backtrack
+	def decide(self):
+		self.marks.append((len(self.trail), len(self.solution),
+			len(self.units), len(self.pures)))
+		self.pending = deque()
+
+
+	# Undoes all assignments made above the given level
+	# @param save : whether to save the undone values as phases
+	def backtrack(self, level, save = True):
+
+		if level >= self.level():
+			return
+
+		trail, solution, units, pures = self.marks[level]
+
+		for x in reversed(self.trail[trail:]):
+			if self.index != None:
+				self.index.update(abs(x), 0)
+			else:
+				self.values[abs(x)] = 0
+				self.count(x, -1)
+			if self.activity != None:
+				self.activity.unassign(x, save)
+			if save:
+				self.phases[abs(x)] = 1 if x > 0 else 2
+
+		del self.trail[trail:]
+		del self.solution[solution:]
+		del self.units[units:]
+		del self.pures[pures:]
+		del self.marks[level:]
+
+		self.head = len(self.trail)
+		self.pending = deque()
+		self.conflict = None
+		self.version += 1
+
+
+	# Assigns a value to a literal
+	# and visits the clauses watching its negation
+	def assign(self, literal, value):
+
+		x = self.code(literal) if value else -self.code(literal)
+
+		# 1. Save the literal which became TRUE in the solutions
+		self.solution.append(str(x))
+
+		# 2. Put it on the trail
+		self.enqueue(x)
+		self.propagate()
+
+
+	# Puts an encoded literal on the trail
+	# together with the clause which implied it
+	# The literal must be unassigned
+	def enqueue(self, x, reason = -1):
+		if self.index != None:
+			self.index.update(abs(x), 1 if x > 0 else 2)
+		else:
+			self.values[abs(x)] = 1 if x > 0 else 2
+			self.count(x, 1)
+		self.levels[abs(x)] = self.level()
+		self.reasons[abs(x)] = reason
+		self.trail.append(x)
+		self.version += 1
+
+
+	# Counts the TRUE literals of the clauses containing
+	# an encoded literal which became TRUE (step 1)
+	# or was unassigned (step -1)
+	def count(self, x, step):
+
+		trues = self.trues
+
+		for c in self.occurrences.get(x, ()):
+			trues[c] += step
+			if trues[c] == (1 if step > 0 else 0):
+				self.satisfied += step
+
+
+	# Visits the clauses watching the negation of
+	# every literal on the trail which was not visited yet
+	#
+	# Moves watches to literals which are not FALSE, collects
+	# clauses which became unit in pending and stops at the
+	# first clause which became empty
+	def propagate(self):
+
+		literals, offsets, watched, values = self.literals, self.offsets, self.watched, self.values
+
+		while self.conflict == None and self.head < len(self.trail):
+
+			x = self.trail[self.head]
+			self.head += 1
+
+			watching = self.watches.get(-x, [])
+			kept = []
+
+			for index, c in enumerate(watching):
+
+				# Make i the index of the FALSE watched literal
+				a, b = watched[2 * c], watched[2 * c + 1]
+				i = 2 * c if literals[a] == -x else 2 * c + 1
+				other = literals[b] if literals[a] == -x else literals[a]
+
+				# Clause already satisfied by the other watch
+				v = values[abs(other)]
+				if v != 0 and (v == 1) == (other > 0):
+					kept.append(c)
+					continue
+
+				# Look for a replacement which is not FALSE
+				for k in xrange(offsets[c], offsets[c + 1]):
+					v = values[abs(literals[k])]
+					if k != a and k != b and (v == 0 or (v == 1) == (literals[k] > 0)):
+						watched[i] = k
+						self.watches.setdefault(literals[k], []).append(c)
+						break
+
+				else:
+					# No replacement : the clause is unit or empty
+					kept.append(c)
+
+					if self.value(other) == None:
+						self.pending.append((other, c))
+					else:
+						self.conflict = c
+						kept.extend(watching[index + 1:])
+						break
+
+			self.watches[-x] = kept
+
+
+	# Unit Propagation
+	# Assigns the literals of clauses which became unit
+	# until there are no more or we have an empty clause
+	def unitPropagate(self):
+
+		while self.conflict == None and self.pending:
+
+			x, reason = self.pending.popleft()
+
+			# Already assigned by an earlier unit
+			if self.value(x) != None:
+				continue
+
+			self.units.append(str(x))
+			self.solution.append(str(x))
+			self.enqueue(x, reason)
+			self.propagate()
+
+
+	# Pure Elimination
+	# Assigns the pure literals found with the occurrences
+	# of the Index or else with the clauses of the view
+	def pureEliminate(self):
+
+		if self.index == None:
+			pures = self.findPures()[0]
+		else:
+			pures = self.index.pures()
+
+		while pures:
+
+			for literal in pures:
+				self.assign(literal, True)
+				self.pures.append(str(literal))
+
+			# With the Index the literals which became pure are
+			# only known once the others are assigned
+			pures = self.index.pures() if self.index != None else []
+
+
+	# Conflict Analysis
+	# Resolves the empty clause with the reasons of its
+	# literals until a single literal of the current level
+	# is left (the first unique implication point)
+	#
+	# @param decision : whether to resolve until the decision of
+	#                   the current level instead, so that the
+	#                   clause asserts its negation
+	# @param probe : whether the conflict was found by a lookahead
+	#                probe, which is neither counted as a conflict
+	#                nor bumps or decays any activity
+	#
+	# @return the learned clause, starting with the negation
+	#         of the unique implication point, and the level
+	#         to backjump to
+	def analyze(self, decision = False, probe = False):
+
+		if not probe:
+			self.conflicts += 1
+
+		seen = set()
+		learned = [None]
+		counter = 0
+		index = len(self.trail) - 1
+		clause = self.clause(self.conflict)
+		x = None
+
+		if not probe:
+			self.bump(self.conflict)
+
+		while True:
+
+			for y in clause:
+
+				v = abs(y)
+
+				# Literals of level 0 are always FALSE
+				if y == x or v in seen or self.levels[v] == 0:
+					continue
+
+				seen.add(v)
+
+				if self.activity != None and not probe:
+					self.activity.bump(v)
+
+				if self.levels[v] == self.level():
+					counter += 1
+				else:
+					learned.append(y)
+
+			# Next literal of the current level to resolve on
+			while abs(self.trail[index]) not in seen:
+				index -= 1
+
+			x = self.trail[index]
+			index -= 1
+			counter -= 1
+
+			if counter == 0 and (not decision or self.reasons[abs(x)] == -1):
+				break
+
+			clause = self.clause(self.reasons[abs(x)])
+			if not probe:
+				self.bump(self.reasons[abs(x)])
+
+		learned[0] = -x
+
+		# Decay the activities of the learned clauses
+		if not probe:
+			self.increment /= 0.999
+
+			if self.activity != None:
+				self.activity.conflict()
+
+		# Backjump to the highest level of the other literals
+		# which becomes the second watched literal
+		level = 0
+		for k in xrange(1, len(learned)):
+			if self.levels[abs(learned[k])] > level:
+				level = self.levels[abs(learned[k])]
+				learned[1], learned[k] = learned[k], learned[1]
+
+		return learned, level
+
+
+	# Adds a learned clause after backjumping
+	# and assigns its first literal which is now unit
+	#
+	# @param conflict : the level of the conflict the clause was
+	#                   derived at, the level of its first literal
+	# @param probe : whether the clause refutes a failed literal of
+	#                a lookahead probe, its first literal is then
+	#                not counted as a unit
+	def learn(self, clause, conflict, probe = False):
+
+		index = len(self.offsets) - 1
+		if self.proof != None:
+			self.proof.add(clause)
+
+		self.literals.extend(clause)
+		self.offsets.append(len(self.literals))
+		self.learned.append(index)
+		self.watch(index)
+
+		# The other literals are still assigned, the first one
+		# counts on the level of the conflict it was derived at
+		self.lbds.append(len(set( self.levels[abs(x)] for x in clause[1:] ) | set([conflict])))
+		self.activities.append(self.increment)
+
+		if not probe:
+			self.units.append(str(clause[0]))
+		self.solution.append(str(clause[0]))
+		self.enqueue(clause[0], index)
+		self.propagate()
+
+
+
+	# Adds variables up to n to the Formula
+	def grow(self, n):
+
+		count = n + 1 - len(self.values)
+		if count <= 0:
+			return
+
+		self.values.extend(bytearray(count))
+		self.levels.extend(array('i', [0]) * count)
+		self.reasons.extend(array('i', [-1]) * count)
+		self.phases.extend(bytearray(count))
+
+		if self.activity != None:
+			self.activity.grow(n)
+
+		self.reindex()
+
+
+	# Builds the Index again after the clauses or variables changed
+	# The assignments of the trail are replayed on the new Index
+	def reindex(self):
+
+		if self.index == None:
+			return
+
+		for x in self.trail:
+			self.values[abs(x)] = 0
+
+		self.index = Index(self)
+
+		for x in self.trail:
+			self.index.update(abs(x), 1 if x > 0 else 2)
+
+
+	# Adds a clause to the clauses of the original CNF
+	# so that the Formula can be solved again with more clauses
+	#
+	# The search is undone down to level 0 and the clause is
+	# stored after the learned clauses, so no clause is moved
+	# or renumbered. Learned clauses stay valid as adding a
+	# clause only removes solutions.
+	#
+	# @param clause : the encoded literals of the clause
+	def addClause(self, clause):
+
+		self.backtrack(0)
+
+		self.grow(max([ abs(x) for x in clause ] or [0]))
+
+		# Duplicate literals are dropped, tautologies are never added
+		seen = set()
+		clause = [ x for x in clause if not (x in seen or seen.add(x)) ]
+
+		if any(-x in seen for x in clause):
+			return
+
+		# Literals which are not FALSE (at level 0) are watched first
+		clause.sort(key=lambda x : self.value(x) == False)
+
+		index, n = len(self.offsets) - 1, len(clause)
+		start = len(self.literals)
+
+		# 1. Store the clause after the learned clauses
+		self.literals.extend(clause)
+		self.offsets.append(start + n)
+		self.watched.append(start)
+		self.watched.append(min(start + 1, start + n - 1))
+		self.lbds.append(0)
+		self.activities.append(0.0)
+		self.added.append(index)
+		self.version += 1
+
+		# 2. Watch the new clause : it is empty or unit when
+		# its second literal is FALSE
+		if n == 0 or self.value(clause[0]) == False:
+			self.conflict = index
+		elif self.value(clause[0]) == None and (n == 1 or self.value(clause[1]) == False):
+			self.pending.append((clause[0], index))
+
+		for position in (set(self.watched[2 * index:2 * index + 2]) if n else []):
+			self.watches.setdefault(self.literals[position], []).append(index)
+
+		# 3. Index or count the new clause
+		self.reindex()
+
+		if self.index == None:
+			k = len(self.trues)
+			for x in clause:
+				self.occurrences.setdefault(x, []).append(k)
+			self.trues.append(sum(1 for x in clause if self.value(x) == True))
+			self.satisfied += 1 if self.trues[-1] else 0
+
+
+	# Bumps the activity of a clause if it is a learned clause
+	def bump(self, index):
+
+		if index < self.size:
+			return
+
+		self.activities[index - self.size] += self.increment
+
+		# Rescale everything before the activities overflow
+		if self.activities[index - self.size] > 1e20:
+			self.activities = [ a * 1e-20 for a in self.activities ]
+			self.increment *= 1e-20
+
+
+	# Returns the bytes used by the learned clauses
+	# in the flat arrays of the Formula
+	def learnedBytes(self):
+		literals = len(self.literals) - self.offsets[self.size]
+		literals -= sum( self.offsets[c + 1] - self.offsets[c] for c in self.added )
+		return literals * self.literals.itemsize + len(self.learned) * (self.offsets.itemsize +
+			2 * self.watched.itemsize + self.lbds.itemsize + 8)
+
+
+	# Returns whether the learned clauses should be reduced :
+	# their number reached the limit, the cap or they use
+	# more memory than allowed. As the kept clauses can exceed
+	# the cap, 10% more clauses must be learned in between.
+	def reduceDue(self):
+
+		if len(self.learned) >= self.limit:
+			return True
+		if len(self.learned) < self.kept + max(10, self.kept / 10):
+			return False
+		if self.cap != None and len(self.learned) > self.cap:
+			return True
+		return self.memory != None and self.learnedBytes() > self.memory
+
+
+	# Deletes the learned clauses least likely to be useful
+	#
+	# Clauses which are the reason of an assigned literal and
+	# clauses with an LBD of at most 2 (glue clauses) are kept.
+	# Half of the others are deleted, those with the highest LBD
+	# and the lowest activity first, or more to respect the cap
+	# and the memory. The remaining clauses, the added clauses of
+	# the original CNF included, are moved to fill the gaps, so
+	# reasons, watches and pending clauses are renumbered.
+	def reduce(self):
+
+		size = self.size
+		locked = set( self.reasons[abs(x)] for x in self.trail if self.reasons[abs(x)] >= size )
+
+		candidates = [ c for c in self.learned if c not in locked and self.lbds[c - size] > 2 ]
+		candidates.sort(key=lambda c : (-self.lbds[c - size], self.activities[c - size]))
+
+		count = len(candidates) / 2
+
+		if self.cap != None:
+			count = max(count, len(self.learned) - self.cap / 2)
+		if self.memory != None and self.learnedBytes() > self.memory / 2:
+			count = max(count, int(len(candidates) * (1 - 0.5 * self.memory / self.learnedBytes())))
+
+		deleted = set(candidates[:count])
+
+		# 1. Move the kept clauses to their new index
+		literals = self.literals[:self.offsets[size]]
+		offsets = self.offsets[:size + 1]
+		watched = self.watched[:2 * size]
+		lbds, activities, renumber = array('i'), [], {}
+
+		for c in xrange(size, len(self.offsets) - 1):
+
+			if c in deleted:
+				if self.proof != None:
+					self.proof.delete(self.clause(c))
+				continue
+
+			start, shift = self.offsets[c], len(literals) - self.offsets[c]
+			renumber[c] = len(offsets) - 1
+
+			literals.extend(self.literals[start:self.offsets[c + 1]])
+			offsets.append(len(literals))
+			watched.append(self.watched[2 * c] + shift)
+			watched.append(self.watched[2 * c + 1] + shift)
+			lbds.append(self.lbds[c - size])
+			activities.append(self.activities[c - size])
+
+		# 2. Renumber the clauses watching each literal,
+		# the reasons and the pending literals
+		for x, watching in self.watches.items():
+			self.watches[x] = [ c if c < size else renumber[c] for c in watching
+				if c < size or c in renumber ]
+
+		for x in self.trail:
+			if self.reasons[abs(x)] >= size:
+				self.reasons[abs(x)] = renumber[self.reasons[abs(x)]]
+
+		self.pending = deque( (x, c if c < size else renumber[c]) for x, c in self.pending
+			if c < size or c in renumber )
+
+		if self.conflict != None and self.conflict >= size:
+			self.conflict = renumber.get(self.conflict)
+
+		self.literals, self.offsets, self.watched = literals, offsets, watched
+		self.lbds, self.activities = lbds, activities
+		self.learned = [ renumber[c] for c in self.learned if c in renumber ]
+		self.added = [ renumber[c] for c in self.added ]
+
+		# The Index refers to the added clauses by their index
+		if self.added:
+			self.reindex()
+
+		self.kept = len(self.learned)
+		self.reductions += 1
+		self.deleted += len(deleted)
+		self.limit += 300
+
+
+
+# An Index keeps the occurrences of every literal in the clauses
+# of the simplified CNF up to date while the Formula is assigned
+# and backtracked, so that the branching heuristics do not have
+# to count them again at every split
+#
+# Only the clauses of the original CNF are indexed. Literals are
+# stored at position x + variables of the arrays.
+#
+# @field formula : the indexed Formula
+# @field variables : the highest variable
+# @field longest : size of the longest clause
+# @field occurs : clauses containing each variable
+# @field active : whether each clause has no TRUE literal
+# @field sizes : number of unassigned literals of each active clause
+# @field remaining : number of active clauses
+# @field counts : occurrences of each literal in active clauses
+# @field weights : Jeroslow-Wang weight of each literal, scaled by
+#                  2^longest to stay an exact integer
+# @field buckets : active clauses of each size
+# @field order : heap of active clauses for the first literal
+#                (None until the first literal is asked for)
+# @field heaps : heap of scores of every heuristic used so far
+# @field dirty : literals whose scores changed since the last selection
+#
+class Index:
+
+	# ========= Fields =========== #
+
+	formula = None
+	variables = 0
+	longest = 0
+	occurs = []
+	active = bytearray()
+	sizes = array('i')
+	remaining = 0
+	counts = array('i')
+	weights = []
+	buckets = []
+	order = []
+	heaps = {}
+	dirty = set()
+
+	# ====== Constructors ======== #
+
+	# Index Constructor
+	# Indexes the clauses of an unassigned Formula
+	def __init__(self, formula):
+
+		self.formula = formula
+		self.variables = len(formula.values) - 1
+		self.longest = max([ formula.offsets[c + 1] - formula.offsets[c]
+			for c in formula.originals() ] or [0])
+
+		# Learned clauses are never active
+		clauses = len(formula.offsets) - 1
+
+		self.occurs = [ [] for v in xrange(self.variables + 1) ]
+		self.active = bytearray(clauses)
+		self.sizes = array('i', [0]) * clauses
+		self.remaining = 0
+		self.counts = array('i', [0]) * (2 * self.variables + 1)
+		self.weights = [0] * (2 * self.variables + 1)
+		self.buckets = [ set() for s in xrange(self.longest + 1) ]
+		self.order = None
+		self.heaps = {}
+		self.dirty = set()
+
+		# Every clause is active and unassigned
+		for c in formula.originals():
+
+			clause = formula.clause(c)
+			weight = 1 << (self.longest - len(clause))
+
+			for v in set(abs(x) for x in clause):
+				self.occurs[v].append(c)
+
+			for x in clause:
+				self.counts[x + self.variables] += 1
+				self.weights[x + self.variables] += weight
+
+			self.active[c] = 1
+			self.sizes[c] = len(clause)
+			self.buckets[len(clause)].add(c)
+
+		self.remaining = formula.size + len(formula.added)
+
+	# ======== Methods =========== #
+
+	# Assigns a value to a variable (see Formula.values)
+	# or unassigns it with 0 and updates the clauses containing it
+	#
+	# The contribution of the active clauses is removed under the
+	# old value and added again under the new one
+	def update(self, v, value):
+
+		literals, offsets, values = self.formula.literals, self.formula.offsets, self.formula.values
+		active, sizes, counts, weights = self.active, self.sizes, self.counts, self.weights
+		n, longest, buckets = self.variables, self.longest, self.buckets
+		dirty = self.dirty if self.heaps else None
+
+		# 1. Remove the contribution of the active clauses
+		for c in self.occurs[v]:
+
+			if not active[c]:
+				continue
+
+			weight = 1 << (longest - sizes[c])
+
+			for k in xrange(offsets[c], offsets[c + 1]):
+				x = literals[k]
+				if values[abs(x)] == 0:
+					counts[x + n] -= 1
+					weights[x + n] -= weight
+					if dirty != None:
+						dirty.add(x)
+
+			buckets[sizes[c]].discard(c)
+
+		values[v] = value
+
+		# 2. Add the contribution of the clauses without TRUE literal
+		for c in self.occurs[v]:
+
+			start, end = offsets[c], offsets[c + 1]
+			size = 0
+
+			for k in xrange(start, end):
+				w = values[abs(literals[k])]
+				if w == 0:
+					size += 1
+				elif (w == 1) == (literals[k] > 0):
+					break
+
+			else:
+				weight = 1 << (longest - size)
+
+				for k in xrange(start, end):
+					x = literals[k]
+					if values[abs(x)] == 0:
+						counts[x + n] += 1
+						weights[x + n] += weight
+						if dirty != None:
+							dirty.add(x)
+
+				sizes[c] = size
+				buckets[size].add(c)
+
+				if not active[c]:
+					active[c] = 1
+					self.remaining += 1
+					if self.order != None:
+						heapq.heappush(self.order, c)
+				continue
+
+			if active[c]:
+				active[c] = 0
+				self.remaining -= 1
+
+
+	# Returns the score of a variable or literal for a heuristic
+	def score(self, id, key):
+
+		n = self.variables
+
+		if id == "dlis":
+			return self.counts[key + n]
+		if id == "jw":
+			return self.weights[key + n]
+		if id == "dlcs":
+			return self.counts[key + n] + self.counts[n - key]
+		return self.weights[key + n] + self.weights[n - key]
+
+
+	# Returns the literal or variable maximizing the score of
+	# a heuristic : dlis and jw score literals, dlcs and jw2 score
+	# variables. Ties are broken by the lowest variable.
+	#
+	# Every heap keeps stale entries which are dropped when they
+	# reach the top : an entry is valid while its score is current.
+	def best(self, id):
+
+		variable = id in ("dlcs", "jw2")
+		heap = self.heaps.get(id)
+
+		# Build the heap the first time or when it is mostly stale
+		if heap == None or len(heap) > 4 * len(self.counts):
+			keys = xrange(1, self.variables + 1) if variable else \
+				[ x for v in xrange(1, self.variables + 1) for x in (v, -v) ]
+			heap = [ (-self.score(id, key), abs(key), key < 0, key) for key in keys ]
+			heapq.heapify(heap)
+			self.heaps[id] = heap
+
+		# Push the scores which changed in every heap
+		for id_, heap_ in self.heaps.items():
+			keys = set(abs(x) for x in self.dirty) if id_ in ("dlcs", "jw2") else self.dirty
+			for key in keys:
+				heapq.heappush(heap_, (-self.score(id_, key), abs(key), key < 0, key))
+		self.dirty = set()
+
+		while True:
+			score, v, negative, key = heap[0]
+			if score != 0 and -score == self.score(id, key):
+				break
+			heapq.heappop(heap)
+
+		if variable:
+			n = self.variables
+			single = self.counts if id == "dlcs" else self.weights
+			key = key if single[key + n] >= single[n - key] else -key
+
+		return self.formula.literal(key)
+
+
+	# Returns the unassigned literals whose negation
+	# does not occur in any active clause
+	def pures(self):
+
+		n, counts = self.variables, self.counts
+		return [ self.formula.literal(x) for v in xrange(1, n + 1) for x in (v, -v)
+			if counts[x + n] > 0 and counts[n - x] == 0 ]
+
+
+	# Returns the active clauses of minimum size
+	# as the clauses of the simplified CNF, in the same order
+	def minClauses(self):
+
+		values = self.formula.values
+
+		for bucket in self.buckets:
+			if bucket:
+				return [ logic.Clause([ self.formula.literal(x)
+					for x in self.formula.clause(c) if values[abs(x)] == 0 ])
+					for c in sorted(bucket) ]
+		return []
+
+
+	# Returns the first literal of the simplified CNF
+	def first(self):
+
+		if self.order == None or len(self.order) > 4 * len(self.active):
+			self.order = [ c for c in xrange(len(self.active)) if self.active[c] ]
+
+		while not self.active[self.order[0]]:
+			heapq.heappop(self.order)
+
+		for x in self.formula.clause(self.order[0]):
+			if self.formula.values[abs(x)] == 0:
+				return self.formula.literal(x)
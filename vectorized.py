@@ -0,0 +1,179 @@
+
+# 15-354
+# Computational Discrete Math
+# -------------------
+# Simple SAT Solver
+# -------------------
+# Daniel Balle 2014
+
+#
+# Computes the scores of the occurrence based branching
+# heuristics of a trail Formula with NumPy : every count
+# is a single reduction over arrays of its clauses
+# instead of a loop over Clause and Literal objects
+#
+
+import branching
+
+try:
+	import numpy
+except ImportError:
+	# The vectorized scores are optional
+	numpy = None
+
+
+# Returns whether NumPy can be used
+def available():
+	return numpy != None
+
+
+# Scores computes the scores of the heuristics from the values of
+# a Formula, once per assignment of the Formula
+#
+# Only the clauses of the original CNF are scored, like the clauses
+# of the view of the Formula. Literals are stored at position
+# x + variables of the arrays of scores.
+#
+# @field formula : the scored Formula
+# @field size : number of clauses of the Formula when the arrays were built
+# @field literals : literals of the clauses, one after the other
+# @field ids : clause of each literal
+# @field polarities : value under which each literal is TRUE (1 or 2)
+# @field version : version of the Formula of the current arrays
+# @field keep : whether each literal is unassigned in a clause without TRUE literal
+# @field sizes : number of unassigned literals of each clause
+# @field active : whether each clause has no TRUE literal
+#
+class Scores:
+
+	# ========= Fields =========== #
+
+	formula = None
+	size = -1
+	literals = None
+	ids = None
+	polarities = None
+	version = -1
+	keep = None
+	sizes = None
+	active = None
+
+	# ====== Constructors ======== #
+
+	# Scores Constructor
+	# Takes the Formula to score
+	def __init__(self, formula):
+
+		if numpy == None:
+			raise ImportError("The vectorized scores need NumPy")
+
+		self.formula = formula
+		self.size = -1
+		self.version = -1
+
+	# ======== Methods =========== #
+
+	# Builds the arrays of the clauses, again once
+	# clauses were added to the Formula
+	def build(self):
+
+		# The clauses added to the Formula are stored
+		# after its learned clauses
+		packed = self.formula.pack()
+		offsets = numpy.frombuffer(packed.offsets, dtype=numpy.int32)
+
+		if offsets[-1] > 0:
+			self.literals = numpy.frombuffer(packed.literals, dtype=numpy.int32)[:offsets[-1]].astype(numpy.int64)
+		else:
+			self.literals = numpy.zeros(0, dtype=numpy.int64)
+
+		self.ids = numpy.repeat(numpy.arange(packed.size()), numpy.diff(offsets))
+		self.polarities = numpy.where(self.literals > 0, 1, 2).astype(numpy.uint8)
+		self.size = packed.size()
+		self.version = -1
+
+
+	# Updates the clauses and literals which are part
+	# of the view of the Formula to its current values
+	def update(self):
+
+		formula = self.formula
+
+		if self.size != formula.size + len(formula.added):
+			self.build()
+		if self.version == formula.version:
+			return
+
+		values = numpy.frombuffer(formula.values, dtype=numpy.uint8)[numpy.abs(self.literals)]
+
+		# A clause is active without TRUE literal
+		true = values == self.polarities
+		self.active = numpy.bincount(self.ids[true], minlength=self.size) == 0
+
+		self.keep = (values == 0) & self.active[self.ids]
+		self.sizes = numpy.bincount(self.ids[self.keep], minlength=self.size)
+		self.version = formula.version
+
+
+	# Returns which literals of the view are in a clause of
+	# minimum size, or all of them when minimum is False
+	def mask(self, minimum):
+
+		if not minimum:
+			return self.keep
+
+		sizes = self.sizes[self.active]
+		if not len(sizes):
+			return self.keep
+
+		return self.keep & (self.sizes[self.ids] == sizes.min())
+
+
+	# Returns the score of every literal for a heuristic :
+	# its occurrences, or its Jeroslow-Wang weight for jw and jw2
+	def scores(self, id, mask):
+
+		n = len(self.formula.values) - 1
+		literals = self.literals[mask] + n
+
+		if id in ("jw", "jw2"):
+			weights = numpy.power(2.0, -self.sizes[self.ids[mask]])
+			return numpy.bincount(literals, weights=weights, minlength=2 * n + 1)
+
+		return numpy.bincount(literals, minlength=2 * n + 1)
+
+
+	# Returns the literal or variable maximizing the score of
+	# a heuristic, over the clauses of minimum size for moms,
+	# momsf, posit and zm
+	#
+	# dlis, jw and moms score literals, the others score variables.
+	# Ties are broken by the lowest variable, then x before -x.
+	def best(self, id):
+
+		self.update()
+
+		mask = self.mask(id in ("moms", "momsf", "posit", "zm"))
+		score = self.scores(id, mask)
+
+		n = len(self.formula.values) - 1
+		positive, negative = score[n + 1:], score[n - 1::-1]
+
+		# zm only counts the negative literals,
+		# the first literal is returned without any
+		if id == "zm":
+			if not negative.any():
+				return self.formula.literal(int(self.literals[mask][0]))
+			return self.formula.literal(-int(negative.argmax() + 1))
+
+		if id in ("dlis", "jw", "moms"):
+			i = int(numpy.column_stack((positive, negative)).argmax())
+			return self.formula.literal(i / 2 + 1 if i % 2 == 0 else -(i / 2 + 1))
+
+		if id == "momsf":
+			combined = (positive + negative) * 2.0 ** branching.k + positive * negative
+		else:
+			combined = positive + negative
+
+		v = int(combined.argmax()) + 1
+		return self.formula.literal(v if positive[v - 1] >= negative[v - 1] else -v)